@@ -1,22 +1,35 @@
+# Imported first so that loading everything else can be timed
+from utils.profiler import Profiler
+
+profile = Profiler()
+
 import os
 import socket
-import subprocess
 
-from libqtile import bar, hook, layout, qtile, widget
-from libqtile.config import (DropDown, EzClick, EzDrag, EzKey, Group, KeyChord,
-                             Match, ScratchPad, Screen)
+from libqtile import hook, layout, qtile, widget
+from libqtile.config import (EzClick, EzDrag, EzKey, Group, KeyChord, Match,
+                             Screen)
 from libqtile.lazy import lazy
 from libqtile.utils import guess_terminal
-from Xlib import display as xdisplay
+
+profile.mark("imports")
 
 import themes
-import utils
 from themes import float_layout, global_layout
 
-# You can import 'colorized' for alternating fonts or 'powerline' for
-# powerline-like styling of widgets
+profile.mark("themes")
+
+import utils
+from utils import (actions, audio, bars, coalesce, fonts, groupbox, images,
+                   keyboard, monitors, mpd, nvidia, routing, sampling,
+                   scheduling, scratchpads, startup, tasks, theming, updates)
+
+# You can import 'colorized' for alternating fonts, or 'powerline', 'slanted',
+# 'rounded' or 'gap' for widgets on coloured segments
 from utils.widget_container import colorized as widget_container
 
+profile.mark("utils")
+
 auto_fullscreen            = True
 bring_front_click          = "floating_only"
 cursor_warp                = False
@@ -37,6 +50,9 @@ extension_defaults = widget_defaults.copy()
 
 prompt = "{0}@{1}: ".format(os.environ["USER"], socket.gethostname())
 
+# Seconds each phase of loading this config may take, see utils/profiler.py
+load_budget = {"total": 0.25, "monitors": 0.02}
+
 myScript   = os.path.expanduser("~/.local/bin/")
 myDMScript = os.path.expanduser("~/.local/bin/dm-scripts/")
 
@@ -49,10 +65,15 @@ date_format = "%a, %d %b %Y"
 
 dmscripts = "~/.local/bin/dm-scripts/"
 
+autostart_jobs = [
+    startup.Job("auto-start", myScript + "auto-start.sh"),
+    # startup.Job("wallpaper", "nitrogen --restore", wait=True),
+    # startup.Job("picom", "picom", after=["wallpaper"]),
+]
+
 @hook.subscribe.startup_once
 def autostart():
-    autostart_script = os.path.expanduser("~/.local/bin/auto-start.sh")
-    subprocess.call([autostart_script])
+    startup.launch(autostart_jobs)
 
 # cli tools
 myTerminal      = guess_terminal()
@@ -94,7 +115,7 @@ mySysPower      = "xfce4-power-manager-settings"
 mySysNetwork    = "nm-connection-editor"
 mySysBluetooth  = "blueman-manager"
 
-floating_layout = layout.Floating(
+floating_layout = routing.Floating(
     float_rules=[
         # default_float_rules include: utility, notification, toolbar, splash, dialog,
         # file_progress, confirm, download and error.
@@ -214,7 +235,6 @@ groups = [
     Group(
         "music",
         label="headphones",
-        spawn=myCliMusic,
         matches=[
             Match(
                 wm_class=[
@@ -291,120 +311,49 @@ groups = [
         ],
     )]
 
+router = routing.attach(groups, floating_layout)
+
 s_width = 0.8
 s_height = 0.8
 s_left_margin = (1.0 - s_height) / 2
 s_top_margin = (1.0 - s_height) / 2
 
-# Add a ScratchPad Group
-groups.append(
-    ScratchPad(
-        "NSP",
-        [
-            DropDown(
-                "terminal",
-                myTerminal,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "htop",
-                myCliSysTasks,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "files",
-                myCliFiles,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "music",
-                myCliMusic,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "virtmanager",
-                myVirtManager,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "torrent",
-                myTorrent,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "calc",
-                myCalculator,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "whatsapp",
-                myWhatsApp,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "discord",
-                myDiscord,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-            DropDown(
-                "anki",
-                myAnki,
-                x=s_left_margin,
-                y=s_top_margin,
-                width=s_width,
-                height=s_height,
-                warp_pointer=False,
-                on_focus_lost_hide=False,
-            ),
-        ],
-    ),
+# Add a ScratchPad Group, see utils/scratchpads.py for the columns
+nsp = scratchpads.Scratchpads(
+    "NSP",
+    [
+        scratchpads.Entry(
+            "terminal", myTerminal, key="M-<Quoteleft>", prewarm="eager"
+        ),
+        scratchpads.Entry("htop", myCliSysTasks, key="C-A-<Delete>", chord="h"),
+        scratchpads.Entry("files", myCliFiles, key="M-e", desc="File Manager"),
+        scratchpads.Entry("music", myCliMusic, chord="m"),
+        scratchpads.Entry(
+            "virtmanager", myVirtManager, chord="v", desc="VirtManager"
+        ),
+        scratchpads.Entry("torrent", myTorrent, chord="t"),
+        scratchpads.Entry("calc", myCalculator, chord="c", desc="Calculator"),
+        scratchpads.Entry(
+            "whatsapp", myWhatsApp, chord="w", desc="WhatsApp", prewarm="idle"
+        ),
+        scratchpads.Entry(
+            "discord", myDiscord, chord="d", prewarm="idle", memory_limit=800
+        ),
+        scratchpads.Entry("anki", myAnki, chord="a", prewarm="idle"),
+    ],
+    x=s_left_margin,
+    y=s_top_margin,
+    width=s_width,
+    height=s_height,
+    warp_pointer=False,
+    on_focus_lost_hide=False,
 )
 
+groups.append(nsp.scratchpad())
+scratchpads.start(nsp)
+
+profile.mark("groups")
+
 layouts = [ layout.MonadTall(**global_layout)
           , layout.Columns(**global_layout)
           , layout.Tile(**global_layout)
@@ -429,13 +378,15 @@ keys.append(
     EzKey( "M-C-d" , lazy.hide_show_bar("all") , desc="Debugging" )
 )
 
+xkb = keyboard.start(languages)
+
 keys.extend([
     EzKey( "M-C-S-r" , lazy.restart()       , desc="Restart qTile"       ),
     EzKey( "M-C-r"   , lazy.reload_config() , desc="Reload qTile Config" ),
     EzKey( "M-C-q"   , lazy.shutdown()      , desc="Quit qTile"          ),
 
     # Swith Keyboard Layouts
-    EzKey( "S-<Alt_L>" , lazy.spawn(myDMScript + "dm-lang") , desc="Language Switching" ),
+    EzKey( "S-<Alt_L>" , lazy.function(xkb.next) , desc="Language Switching" ),
 
     # Changing UI
     KeyChord( [ mod ] , "t" , [
@@ -470,17 +421,17 @@ keys.extend([
 ])
 
 keys.extend([
-    EzKey( "M-S-h" , lazy.layout.shuffle_left()  , desc="Swap focused Window with the one to the left"  ),
-    EzKey( "M-S-l" , lazy.layout.shuffle_right() , desc="Swap focused Window with the one to the right" ),
-    EzKey( "M-S-j" , lazy.layout.shuffle_down()  , desc="Swap focused Window with the one below"        ),
-    EzKey( "M-S-k" , lazy.layout.shuffle_up()    , desc="Swap focused Window with the one above"        ),
+    EzKey( "M-S-h" , coalesce.layout("shuffle_left")  , desc="Swap focused Window with the one to the left"  ),
+    EzKey( "M-S-l" , coalesce.layout("shuffle_right") , desc="Swap focused Window with the one to the right" ),
+    EzKey( "M-S-j" , coalesce.layout("shuffle_down")  , desc="Swap focused Window with the one below"        ),
+    EzKey( "M-S-k" , coalesce.layout("shuffle_up")    , desc="Swap focused Window with the one above"        ),
 ])
 
 keys.extend([
-    EzKey( "M-C-h" , lazy.layout.grow_left()  , desc="Grow focused Window left"  ),
-    EzKey( "M-C-l" , lazy.layout.grow_right() , desc="Grow focused Window right" ),
-    EzKey( "M-C-j" , lazy.layout.grow_down()  , desc="Grow focused Window down"  ),
-    EzKey( "M-C-k" , lazy.layout.grow_up()    , desc="Grow focused Window up"    ),
+    EzKey( "M-C-h" , coalesce.layout("grow_left")  , desc="Grow focused Window left"  ),
+    EzKey( "M-C-l" , coalesce.layout("grow_right") , desc="Grow focused Window right" ),
+    EzKey( "M-C-j" , coalesce.layout("grow_down")  , desc="Grow focused Window down"  ),
+    EzKey( "M-C-k" , coalesce.layout("grow_up")    , desc="Grow focused Window up"    ),
 ])
 
 
@@ -559,33 +510,18 @@ for i in range(getNumberOfKeysForGroups()):
         EzKey( f"M-S-{key}" , lazy.window.togroup(name)   )
     ])
 
-keys.extend([
-    EzKey( "M-<Quoteleft>" , lazy.group["NSP"].dropdown_toggle("terminal") , desc="Terminal Scratchpad"     ) ,
-    EzKey( "M-e"           , lazy.group["NSP"].dropdown_toggle("files"   ) , desc="File Manager Scratchpad" ) ,
-    EzKey( "C-A-<Delete>"  , lazy.group["NSP"].dropdown_toggle("htop"    ) , desc="Htop Scratchpad"         ) ,
-
-    KeyChord( [ mod ] , "s" , [
-        EzKey( "a" , lazy.group["NSP"].dropdown_toggle("anki"       ) , desc="Anki Scratchpad"        ) ,
-        EzKey( "c" , lazy.group["NSP"].dropdown_toggle("calc"       ) , desc="Calculator Scratchpad"  ) ,
-        EzKey( "d" , lazy.group["NSP"].dropdown_toggle("discord"    ) , desc="Discord Scratchpad"     ) ,
-        EzKey( "h" , lazy.group["NSP"].dropdown_toggle("htop"       ) , desc="Htop Scratchpad"        ) ,
-        EzKey( "m" , lazy.group["NSP"].dropdown_toggle("music"      ) , desc="Music Scratchpad"       ) ,
-        EzKey( "t" , lazy.group["NSP"].dropdown_toggle("torrent"    ) , desc="Torrent Scratchpad"     ) ,
-        EzKey( "v" , lazy.group["NSP"].dropdown_toggle("virtmanager") , desc="VirtManager Scratchpad" ) ,
-        EzKey( "w" , lazy.group["NSP"].dropdown_toggle("whatsapp"   ) , desc="WhatsApp Scratchpad"    ) ,
-    ], name="Scratchpads"),
-])
+keys.extend(nsp.keys(chord=([mod], "s")))
 
 keys.extend([
-    EzKey( "<XF86AudioRaiseVolume>"   , lazy.spawn(myScript + "set-volume.sh + 2") , desc="Increase System Volume" ),
-    EzKey( "<XF86AudioLowerVolume>"   , lazy.spawn(myScript + "set-volume.sh - 2") , desc="Decrease System Volume" ),
-    EzKey( "<XF86AudioMute>"          , lazy.spawn(myScript + "toggle-mute.sh"   ) , desc="Mute"                   ),
-    EzKey( "C-<XF86AudioRaiseVolume>" , lazy.spawn("mpc volume +2"               ) , desc="Increase Player Volume" ),
-    EzKey( "C-<XF86AudioLowerVolume>" , lazy.spawn("mpc volume -2"               ) , desc="Decrease Player Volume" ),
-    EzKey( "<XF86AudioPrev>"          , lazy.spawn("mpc prev"                    ) , desc="Prev Song"              ),
-    EzKey( "<XF86AudioNext>"          , lazy.spawn("mpc next"                    ) , desc="Next Song"              ),
-    EzKey( "<XF86AudioPlay>"          , lazy.spawn("mpc toggle"                  ) , desc="Play/Pause Music"       ),
-    EzKey( "<XF86AudioStop>"          , lazy.spawn("mpc stop"                    ) , desc="Stop Music"             ),
+    EzKey( "<XF86AudioRaiseVolume>"   , actions.volume( +2 , myScript + "set-volume.sh + 2"       ) , desc="Increase System Volume" ),
+    EzKey( "<XF86AudioLowerVolume>"   , actions.volume( -2 , myScript + "set-volume.sh - 2"       ) , desc="Decrease System Volume" ),
+    EzKey( "<XF86AudioMute>"          , actions.mute(        myScript + "toggle-mute.sh"          ) , desc="Mute"                   ),
+    EzKey( "C-<XF86AudioRaiseVolume>" , actions.player_volume( +2 , "mpc volume +2" )               , desc="Increase Player Volume" ),
+    EzKey( "C-<XF86AudioLowerVolume>" , actions.player_volume( -2 , "mpc volume -2" )               , desc="Decrease Player Volume" ),
+    EzKey( "<XF86AudioPrev>"          , actions.player( "prev"        , fallback="mpc prev"      ) , desc="Prev Song"              ),
+    EzKey( "<XF86AudioNext>"          , actions.player( "next"        , fallback="mpc next"      ) , desc="Next Song"              ),
+    EzKey( "<XF86AudioPlay>"          , actions.player( "toggle"      , fallback="mpc toggle"    ) , desc="Play/Pause Music"       ),
+    EzKey( "<XF86AudioStop>"          , actions.player( "stop"        , fallback="mpc stop"      ) , desc="Stop Music"             ),
 ])
 
 keys.extend([
@@ -672,19 +608,21 @@ mouse = [
     EzClick( "M-2", lazy.window.bring_to_front()),
 ]
 
+profile.mark("keys")
+
 def separator(size=6, backround=themes.background):
     return widget.Sep(linewidth=0, padding=size, background=backround)
 
 def start_widget():
-    return widget.Image(
+    return images.Image(
         filename=themes.distributor_logo,
         mouse_callbacks={
             "Button1": lambda: qtile.cmd_spawn(myLauncher),
         },
     )
 
-def profile():
-    return widget.Image(
+def profile_icon():
+    return images.Image(
         filename=themes.user_icon,
         mouse_callbacks={
             "Button1": lambda: qtile.cmd_spawn(myDMScript + "dm-power"),
@@ -701,7 +639,7 @@ def prompt_widget(bg=themes.prompt, fg=themes.fg_dark):
     )
 
 def time(bg=themes.background, fg=themes.foreground):
-    return widget.Clock(
+    return scheduling.Clock(
         font=themes.font_bold, foregroung=fg, background=bg, format=time_format
     )
 
@@ -715,17 +653,19 @@ def date(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.Clock(
+        scheduling.Clock(
             font=themes.font_bold, foreground=fg, background=bg, format=date_format
         ),
     ]
 
+layout_icon_scale = 0.6
+
 def layout_icon(bg=themes.background, fg=themes.foreground):
-    return widget.CurrentLayoutIcon(
-        # custom_icon_paths=[os.path.expanduser("~/.config/qtile/icons")],
+    return images.CurrentLayoutIcon(
+        custom_icon_paths=[images.icon_dir],
         foreground=fg,
         background=bg,
-        scale=0.6,
+        scale=layout_icon_scale,
         mouse_callbacks={
             "Button1": lambda: qtile.cmd_next_layout(),
             "Button2": lambda: qtile.cmd_to_layout_index(0),
@@ -736,7 +676,7 @@ def layout_icon(bg=themes.background, fg=themes.foreground):
     )
 
 def group_box():
-    return widget.GroupBox(
+    return groupbox.GroupBox(
         font=themes.font_awesome,
         fontsize=themes.group_icon_size,
         margin_y=3,
@@ -767,7 +707,7 @@ def window_name(bg=themes.background, fg=themes.foreground):
     )
 
 def task_list(bg=themes.background, fg=themes.foreground):
-    return widget.TaskList(
+    return tasks.TaskList(
         font=themes.font_bold,
         highlight_method=themes.tasklist_highlight_method,
         border=themes.selection_bg,
@@ -792,17 +732,12 @@ def notify():
     )
 
 def keyboard_layout(bg=themes.background, fg=themes.foreground):
-    return widget.KeyboardLayout(
+    # Left click switches to the next layout, right click to the previous one
+    return keyboard.KeyboardLayout(
+        switcher=xkb,
         foreground=fg,
         background=bg,
-        configured_keyboards=languages,
         font=themes.font_bold,
-        mouse_callbacks={
-            # This doesn't work
-            # "Button1": lambda: lazy.widget["keyboardlayout"].next_keyboard(),
-            "Button1": lambda: qtile.cmd_spawn("setxkbmap us"),
-            "Button3": lambda: qtile.cmd_spawn("setxkbmap ru"),
-        },
     )
 
 def sys_tray(bg=themes.background, fg=themes.foreground):
@@ -826,31 +761,24 @@ def updater(bg=themes.background, fg=themes.foreground):
                 ),
             },
         ),
-        widget.CheckUpdates(
-            distro="Arch_checkupdates",
+        updates.Updates(
             display_format="{updates}",
             no_update_string="n/a",
-            update_interval="1800",
             font=themes.font_bold,
             colour_have_updates=fg,
             colour_no_updates=fg,
             background=bg,
         ),
-        widget.CheckUpdates(
-            distro="Arch",
-            custom_command="pacman -Qu | grep -e nvidia -e linux",
-            update_interval="1800",
+        updates.Updates(
+            subset="kernel",
             display_format="",
             font=themes.font_awesome,
             fontsize=themes.icon_size - 3,
             colour_have_updates=themes.alert,
-            # colour_no_updates=themes.foreground,
             background=bg,
         ),
-        widget.CheckUpdates(
-            distro="Arch",
-            custom_command="pacman -Qu | grep -e nvidia -e linux",
-            update_interval="1800",
+        updates.Updates(
+            subset="kernel",
             display_format="{updates}",
             font=themes.font_bold,
             colour_have_updates=themes.alert,
@@ -869,7 +797,7 @@ def volume(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.Volume(
+        audio.Volume(
             font=themes.font_bold,
             foreground=fg,
             background=bg,
@@ -880,6 +808,27 @@ def volume(bg=themes.background, fg=themes.foreground):
         ),
     ]
 
+def music(bg=themes.background, fg=themes.foreground):
+    return [
+        widget.TextBox(
+            text="",
+            font=themes.font_awesome,
+            fontsize=themes.icon_size - 3,
+            padding_x=2,
+            foreground=fg,
+            background=bg,
+        ),
+        mpd.NowPlaying(
+            font=themes.font_bold,
+            stopped_text="n/a",
+            foreground=fg,
+            background=bg,
+            mouse_callbacks={
+                "Button3": lambda: nsp.toggle(qtile, "music"),
+            },
+        ),
+    ]
+
 def chord(bg=themes.chord, fg=themes.fg_dark):
     return widget.Chord(
         font=themes.font_bold,
@@ -898,10 +847,10 @@ def network_graph(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.NetGraph(
+        sampling.NetGraph(
             interface="eno1",
             border_width=0,
-            samples=95,
+            samples="auto",
             line_width=2,
             graph_color=fg,
             fill_color="{}.5".format(fg),
@@ -919,7 +868,7 @@ def cpu_graph(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.ThermalSensor(
+        sampling.ThermalSensor(
             font=themes.font_bold,
             foreground_alert=themes.alert,
             foreground=fg,
@@ -934,9 +883,9 @@ def cpu_graph(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.CPUGraph(
+        sampling.CPUGraph(
             border_width=0,
-            samples=95,
+            samples="auto",
             line_width=2,
             graph_color=fg,
             fill_color="{}.5".format(fg),
@@ -954,9 +903,9 @@ def memory_graph(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.MemoryGraph(
+        sampling.MemoryGraph(
             border_width=0,
-            samples=95,
+            samples="auto",
             line_width=2,
             graph_color=fg,
             fill_color="{}.5".format(fg),
@@ -974,7 +923,7 @@ def thermals(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.ThermalSensor(
+        sampling.ThermalSensor(
             font=themes.font_bold,
             foreground_alert=themes.alert,
             foreground=fg,
@@ -993,7 +942,7 @@ def network(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.Net(
+        scheduling.Net(
             font=themes.font_bold,
             interface="eno1",
             format="{down} | {up}",
@@ -1013,7 +962,7 @@ def memory(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.Memory(
+        scheduling.Memory(
             font=themes.font_bold,
             foreground=fg,
             background=bg,
@@ -1031,7 +980,7 @@ def nvidia_sensors(bg=themes.background, fg=themes.foreground):
             foreground=fg,
             background=bg,
         ),
-        widget.NvidiaSensors(
+        nvidia.NvidiaSensors(
             font=themes.font_bold,
             foreground_alert=themes.alert,
             foreground=fg,
@@ -1067,11 +1016,22 @@ def primary_bar():
                 widgets=[ updater
                         , thermals
                         , network_graph
+                        , music
                         , volume
                         , date ])
-           , profile()
+           , profile_icon()
     ]
 
+@utils.shared
+def secondary_sensors():
+    return widget_container(
+        widgets=[ nvidia_sensors
+                , cpu_graph
+                , memory_graph
+                , network_graph
+                , volume
+                , date ])
+
 def secondary_bar():
     return [ separator()
            , start_widget()
@@ -1081,50 +1041,28 @@ def secondary_bar():
            , layout_icon()
            , separator(40)
            , task_list()
-           ,*widget_container(
-                widgets=[ nvidia_sensors
-                        , cpu_graph
-                        , memory_graph
-                        , network_graph
-                        , volume
-                        , date ])
+           ,*secondary_sensors()
     ]
 
 def init_bar(s="secondary"):
-    if s == "primary": my_bar = primary_bar()
-    elif s == "secondary": my_bar = secondary_bar()
-    else: my_bar = secondary_bar()
-
-    return bar.Bar( my_bar
-                  , themes.bar_size
-                  , background=themes.background
-                  , opacity=themes.bar_opacity
+    with profile.phase("bar:" + s):
+        if s == "primary": my_bar = primary_bar()
+        elif s == "secondary": my_bar = secondary_bar()
+        else: my_bar = secondary_bar()
+
+    return bars.Bar( my_bar
+                   , themes.bar_size
+                   , background=themes.background
+                   , opacity=themes.bar_opacity
     )
 
-def get_num_monitors():
-    num_monitors = 0
-    try:
-        display = xdisplay.Display()
-        screen = display.screen()
-        resources = screen.root.xrandr_get_screen_resources()
-
-        for output in resources.outputs:
-            monitor = display.xrandr_get_output_info(output, resources.config_timestamp)
-            preferred = False
-            if hasattr(monitor, "preferred"):
-                preferred = monitor.preferred
-            elif hasattr(monitor, "num_preferred"):
-                preferred = monitor.num_preferred
-            if preferred:
-                num_monitors += 1
-    except Exception as e:
-        # always setup at least one monitor
-        return 1
-    else:
-        return num_monitors
+profile.mark("widgets")
 
+with profile.phase("monitors"):
+    num_monitors = monitors.topology.count()
 
-num_monitors = get_num_monitors()
+with profile.phase("images"):
+    images.prewarm(themes.bar_size - 1, layout_icon_scale)
 
 screens = [
     Screen(
@@ -1139,3 +1077,24 @@ if num_monitors > 1:
                 top=init_bar("secondary"),
             )
         )
+
+profile.finish(load_budget)
+
+@hook.subscribe.screen_change
+def add_screens(event):
+    monitors.topology.invalidate()
+    for m in range(len(screens), monitors.topology.count()):
+        screens.append(
+            Screen(
+                top=init_bar("secondary"),
+            )
+        )
+
+theming.expose()
+
+bars.expose()
+
+images.expose()
+
+fonts.install()
+fonts.expose()
@@ -1,4 +1,138 @@
+import ast
+import importlib
+import os
+import pkgutil
+from types import SimpleNamespace
+
 from themes.default import *
 
-foreground = color.base07
-background = color.base00
+base16_slots = ["base0" + digit for digit in "0123456789ABCDEF"]
+
+# Terminal palettes (dracula.py, gruvbox.py, ...) mapped like base16-shell
+terminal_slots = dict(
+    zip(
+        base16_slots,
+        [
+            "bg",
+            "bg1",
+            "bg2",
+            "gray8",
+            "fg4",
+            "white7",
+            "fg1",
+            "fg",
+            "red1",
+            "orange16",
+            "yellow3",
+            "green2",
+            "cyan6",
+            "blue4",
+            "magenta5",
+            "orange17",
+        ],
+    )
+)
+
+def missing(names):
+    # The colours a module lacks to be read as either kind of palette
+    if "base00" in names:
+        return [slot for slot in base16_slots if slot not in names]
+    return [key for key in terminal_slots.values() if key not in names]
+
+def _defined(name):
+    # Top level names of a palette module, read without importing it
+    with open(os.path.join(__path__[0], name + ".py")) as f:
+        tree = ast.parse(f.read())
+    return {
+        target.id
+        for node in tree.body
+        if isinstance(node, ast.Assign)
+        for target in node.targets
+        if isinstance(target, ast.Name)
+    }
+
+# Palettes are only listed here, a palette module is imported the first time
+# one of its colours is looked up
+modules = [m.name for m in pkgutil.iter_modules(__path__) if m.name != "default"]
+registry = sorted(name for name in modules if not missing(_defined(name)))
+
+_colors = {}
+
+class Colour(str):
+    # A colour value that remembers the role (and position in it) it came from,
+    # so a theme switch can repaint it by role even if two roles share a value
+    def __new__(cls, value, role=None):
+        colour = str.__new__(cls, value)
+        colour.role = role
+        return colour
+
+def _tag(value, role):
+    if isinstance(value, str):
+        return Colour(value, role)
+    if isinstance(value, list):
+        return [_tag(v, role + (i,)) for i, v in enumerate(value)]
+    if isinstance(value, dict):
+        return {key: _tag(v, role + (key,)) for key, v in value.items()}
+    return value
+
+def lookup(roles, role):
+    # The current value of a tagged colour, None if its role is gone
+    value = roles
+    try:
+        for key in role:
+            value = value[key]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return value
+
+def _load(name, reload=False):
+    module = importlib.import_module("themes." + name)
+    if reload:
+        # dm-theme rewrites the palette file in place
+        module = importlib.reload(module)
+    absent = missing(vars(module))
+    if absent:
+        raise ValueError(
+            "Theme palette {} is missing: {}".format(name, ", ".join(absent))
+        )
+    if hasattr(module, "base00"):
+        return module
+    return SimpleNamespace(
+        **{slot: getattr(module, key) for slot, key in terminal_slots.items()}
+    )
+
+def select(name, reload=False):
+    # Returns only the colour roles whose value actually changed
+    global palette
+    if name not in registry:
+        if name in modules:
+            raise ValueError(
+                "Theme palette {} is missing: {}".format(
+                    name, ", ".join(missing(_defined(name)))
+                )
+            )
+        raise ValueError("Unknown theme palette: {}".format(name))
+
+    roles = {
+        role: _tag(value, (role,))
+        for role, value in colors(_load(name, reload)).items()
+    }
+    changed = {
+        role: value for role, value in roles.items() if _colors.get(role) != value
+    }
+    _colors.update(changed)
+    palette = name
+    return changed
+
+def current():
+    if not _colors:
+        select(palette)
+    return dict(_colors)
+
+def __getattr__(name):
+    if not _colors:
+        select(palette)
+    try:
+        return _colors[name]
+    except KeyError:
+        raise AttributeError("module 'themes' has no attribute '{}'".format(name))
@@ -1,6 +1,3 @@
-import themes.material as material
-import themes.base16 as color
-
 # ░█▀▀░▀█▀░▀▀█░█▀▀░█▀▀
 # ░▀▀█░░█░░▄▀░░█▀▀░▀▀█
 # ░▀▀▀░▀▀▀░▀▀▀░▀▀▀░▀▀▀
@@ -55,45 +52,46 @@ tasklist_icon_size = 12
 # ░█░░░█░█░█░░░█░█░█▀▄░▀▀█
 # ░▀▀▀░▀▀▀░▀▀▀░▀▀▀░▀░▀░▀▀▀
 
-fg_dark = color.base01
-inactive = color.base02
-alert = color.base08
-warning = color.base0A
-
-selection_bg = color.base03
-selection_accent = color.base0A
-unfocused_selection_accent = color.base0A
-other_selection_accent = color.base02
-unfocused_other_selection_accent = color.base03
-
-prompt = color.base09
-chord = color.base0E
-
-power_line_colors = [
-    color.base08,
-    color.base0B,
-    color.base0A,
-    color.base0D,
-    color.base0E,
-    color.base0C,
-]
-
-# ░█░░░█▀█░█░█░█▀█░█░█░▀█▀░█▀▀
-# ░█░░░█▀█░░█░░█░█░█░█░░█░░▀▀█
-# ░▀▀▀░▀░▀░░▀░░▀▀▀░▀▀▀░░▀░░▀▀▀
-
-global_layout = {
-    "margin": gap,
-    "border_width": 5,
-    "border_focus": color.base0E,
-    "border_normal": color.base03,
-    "border_focus_stack": color.base0B,
-    "border_normal_stack": color.base0C,
-    "single_border_width": 5,
-}
-
-float_layout = {
-    "border_width": 5,
-    "border_focus": color.base0E,
-    "border_normal": color.base03,
-}
+# Any module in themes/ with base16 or terminal (color0-15) colours
+palette = "base16"
+
+
+def colors(color):
+    # Colour roles and layout colours for a base16 palette
+    return {
+        "foreground": color.base07,
+        "background": color.base00,
+        "fg_dark": color.base01,
+        "inactive": color.base02,
+        "alert": color.base08,
+        "warning": color.base0A,
+        "selection_bg": color.base03,
+        "selection_accent": color.base0A,
+        "unfocused_selection_accent": color.base0A,
+        "other_selection_accent": color.base02,
+        "unfocused_other_selection_accent": color.base03,
+        "prompt": color.base09,
+        "chord": color.base0E,
+        "power_line_colors": [
+            color.base08,
+            color.base0B,
+            color.base0A,
+            color.base0D,
+            color.base0E,
+            color.base0C,
+        ],
+        "global_layout": {
+            "margin": gap,
+            "border_width": 5,
+            "border_focus": color.base0E,
+            "border_normal": color.base03,
+            "border_focus_stack": color.base0B,
+            "border_normal_stack": color.base0C,
+            "single_border_width": 5,
+        },
+        "float_layout": {
+            "border_width": 5,
+            "border_focus": color.base0E,
+            "border_normal": color.base03,
+        },
+    }
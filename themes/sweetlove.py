@@ -1,5 +1,3 @@
-import theme.colors.material as material
-
 # https://terminal.sexy/#Hx8fwLGLSjY30XtJe4dIr4ZaU1xcd1dZbXFewLGLQC4urF0vZHA1j2hAREtLYURFWFxJl4ll
 # Termite export format is very easy to convert: %s/\(\#\w{6}\)/"\1"/g
 
@@ -1,3 +1,21 @@
+from functools import wraps
+
+import libqtile
+
 def clear_default_groups(qtile):
     for i in range(10):
         qtile.cmd_delgroup(str(i + 1))
+
+def expose_command(name, func):
+    setattr(libqtile.qtile, "cmd_" + name, func)
+
+def shared(factory):
+    instances = {}
+
+    @wraps(factory)
+    def wrapper(*args):
+        if args not in instances:
+            instances[args] = factory(*args)
+        return list(instances[args])
+
+    return wrapper
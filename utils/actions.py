@@ -0,0 +1,30 @@
+from libqtile.lazy import lazy
+from libqtile.log_utils import logger
+
+from utils import audio, coalesce, mpd
+
+def native(action, fallback, window=None):
+    # action is called with the number of key presses it stands for
+    def run(qtile, count):
+        try:
+            action(count)
+        except Exception as error:
+            logger.warning("Native action failed (%s), running '%s'", error, fallback)
+            for _ in range(count):
+                qtile.cmd_spawn(fallback)
+
+    if window:
+        return coalesce.repeat(run, window)
+    return lazy.function(run, 1)
+
+def volume(change, fallback, window=coalesce.repeat_window):
+    return native(lambda count: audio.mixer.change(change * count), fallback, window)
+
+def mute(fallback):
+    return native(lambda count: audio.mixer.toggle_mute(), fallback)
+
+def player(command, *args, fallback):
+    return native(lambda count: getattr(mpd.client, command)(*args), fallback)
+
+def player_volume(change, fallback, window=coalesce.repeat_window):
+    return native(lambda count: mpd.client.volume(change * count), fallback, window)
@@ -0,0 +1,209 @@
+import asyncio
+
+from libqtile import widget
+from libqtile.log_utils import logger
+
+from utils import sampling
+
+try:
+    import pulsectl
+except ImportError:
+    pulsectl = None
+
+try:
+    import alsaaudio
+except ImportError:
+    alsaaudio = None
+
+class PulseMixer:
+    # Sink volume and mute changes, and default sink switches
+    monitor = ("pactl", "subscribe")
+    events = ("on sink #", "on server")
+
+    def __init__(self):
+        self.pulse = pulsectl.Pulse("qtile")
+
+    def sink(self):
+        return self.pulse.get_sink_by_name(self.pulse.server_info().default_sink_name)
+
+    def get(self):
+        sink = self.sink()
+        return round(sink.volume.value_flat * 100), bool(sink.mute)
+
+    def change(self, change):
+        sink = self.sink()
+        volume = min(max(sink.volume.value_flat + change / 100, 0), 1)
+        self.pulse.volume_set_all_chans(sink, volume)
+        return round(volume * 100), bool(sink.mute)
+
+    def toggle_mute(self):
+        sink = self.sink()
+        self.pulse.mute(sink, not sink.mute)
+        return round(sink.volume.value_flat * 100), not sink.mute
+
+
+class AlsaMixer:
+    monitor = ("alsactl", "monitor")
+    events = ("",)
+
+    def __init__(self, control="Master"):
+        self.control = control
+
+    def get(self):
+        # A fresh Mixer, an open one doesn't see changes made by others
+        mixer = alsaaudio.Mixer(self.control)
+        return mixer.getvolume()[0], bool(mixer.getmute()[0])
+
+    def change(self, change):
+        mixer = alsaaudio.Mixer(self.control)
+        volume = min(max(mixer.getvolume()[0] + change, 0), 100)
+        mixer.setvolume(volume)
+        return volume, bool(mixer.getmute()[0])
+
+    def toggle_mute(self):
+        mixer = alsaaudio.Mixer(self.control)
+        muted = not mixer.getmute()[0]
+        mixer.setmute(1 if muted else 0)
+        return mixer.getvolume()[0], muted
+
+class Mixer:
+    def __init__(self, restart=1, max_restart=60):
+        self.backend = None
+        self.restart = restart
+        self.max_restart = max_restart
+        self.state = None
+        self.subscribers = []
+        self.task = None
+
+    @property
+    def available(self):
+        return bool(pulsectl or alsaaudio)
+
+    def _backend(self):
+        if self.backend is None:
+            if pulsectl:
+                self.backend = PulseMixer()
+            elif alsaaudio:
+                self.backend = AlsaMixer()
+            else:
+                raise RuntimeError("Neither pulsectl nor pyalsaaudio is installed")
+        return self.backend
+
+    def _call(self, name, *args):
+        try:
+            state = getattr(self._backend(), name)(*args)
+        except Exception:
+            self.backend = None
+            raise
+        self.publish(state)
+        return state
+
+    def get(self):
+        return self._call("get")
+
+    def change(self, change):
+        return self._call("change", change)
+
+    def toggle_mute(self):
+        return self._call("toggle_mute")
+
+    def subscribe(self, callback):
+        if self.state is None:
+            try:
+                self.get()
+            except Exception:
+                logger.exception("Unable to read the volume")
+        self.subscribers.append(callback)
+        if self.state is not None:
+            callback(self.state)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._watch())
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+        if not self.subscribers and self.task:
+            self.task.cancel()
+            self.task = None
+
+    def publish(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        for callback in list(self.subscribers):
+            try:
+                callback(state)
+            except Exception:
+                logger.exception("Volume subscriber failed")
+
+    async def _watch(self):
+        delay = self.restart
+        while self.subscribers:
+            try:
+                backend = self._backend()
+                proc = await asyncio.create_subprocess_exec(
+                    *backend.monitor,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+            except Exception as error:
+                logger.warning("Unable to watch the volume: %s", error)
+            else:
+                try:
+                    async for line in proc.stdout:
+                        if any(event in line.decode() for event in backend.events):
+                            delay = self.restart
+                            self.get()
+                except Exception:
+                    logger.exception("Volume event handling failed")
+                finally:
+                    if proc.returncode is None:
+                        try:
+                            proc.kill()
+                        except ProcessLookupError:
+                            pass
+                await proc.wait()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_restart)
+
+mixer = Mixer()
+
+class Volume(sampling.Volume):
+    def __init__(self, **config):
+        sampling.Volume.__init__(self, **config)
+        self.mixer = None
+
+    def timer_setup(self):
+        if not mixer.available:
+            sampling.Volume.timer_setup(self)
+            return
+        self.mixer = mixer
+        self.mixer.subscribe(self.on_change)
+        if self.theme_path:
+            self.setup_images()
+
+    def finalize(self):
+        if self.mixer is None:
+            sampling.Volume.finalize(self)
+            return
+        self.mixer.unsubscribe(self.on_change)
+        widget.Volume.finalize(self)
+
+    def on_change(self, state):
+        volume, muted = state
+        self.on_volume(-1 if muted else volume)
+
+    def cmd_increase_vol(self):
+        if self.mixer is None:
+            return sampling.Volume.cmd_increase_vol(self)
+        self.mixer.change(self.step)
+
+    def cmd_decrease_vol(self):
+        if self.mixer is None:
+            return sampling.Volume.cmd_decrease_vol(self)
+        self.mixer.change(-self.step)
+
+    def cmd_mute(self):
+        if self.mixer is None:
+            return sampling.Volume.cmd_mute(self)
+        self.mixer.toggle_mute()
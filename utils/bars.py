@@ -0,0 +1,189 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from libqtile import bar, qtile, widget
+from libqtile.widget import base
+
+from utils import expose_command
+
+static = (widget.Sep, widget.Spacer)
+
+def content(w):
+    # None means the widget can't tell and is always rendered
+    if hasattr(w, "content_key"):
+        return w.content_key()
+    if isinstance(w, static):
+        return (type(w), w.background)
+    if isinstance(w, widget.Image) and type(w).draw is widget.Image.draw:
+        return (type(w), w.filename, w.background)
+    if isinstance(w, base._TextBox) and type(w).draw is base._TextBox.draw:
+        return (
+            w.formatted_text,
+            w.foreground,
+            w.layout.colour if w.layout else None,
+            w.background,
+            w.font,
+            w.fontsize,
+            w.padding,
+        )
+    return None
+
+class Bar(bar.Bar):
+    def __init__(self, widgets, size, **config):
+        bar.Bar.__init__(self, widgets, size, **config)
+        self.tracking = not os.environ.get("QTILE_FULL_REDRAW")
+        self.frames = {}
+        self.tracked = set()
+        self.full = False
+        self.force = True
+        self.batching = False
+        self.pending = {}
+        self.stats = {"rendered": 0, "blitted": 0, "skipped": 0, "draws": 0}
+
+    def _configure(self, qtile, screen, reconfigure=False):
+        bar.Bar._configure(self, qtile, screen, reconfigure)
+        self.force = True
+        for w in self.widgets:
+            if id(w) not in self.tracked:
+                self.tracked.add(id(w))
+                w.draw = self._track(w, w.draw)
+
+    def process_window_expose(self):
+        self.force = True
+        bar.Bar.process_window_expose(self)
+
+    def _actual_draw(self):
+        self.stats["draws"] += 1
+        self.full = True
+        try:
+            bar.Bar._actual_draw(self)
+        finally:
+            self.full = False
+            self.force = False
+
+    def _track(self, w, render):
+        def draw():
+            if self.batching and not self.full:
+                self.pending[w] = True
+                return
+            frame = (w.offset, w.length)
+            key = content(w) if self.tracking else None
+            last = self.frames.get(w)
+            pixels = w.width * w.height
+            if self.full and not self.force and key is not None and last:
+                if last == (frame, key):
+                    self.stats["skipped"] += pixels
+                    return
+                if last[1] == key and last[0][1] == frame[1]:
+                    w.drawer.draw(
+                        offsetx=w.offsetx,
+                        offsety=w.offsety,
+                        width=w.width,
+                        height=w.height,
+                    )
+                    self.frames[w] = (frame, key)
+                    self.stats["blitted"] += pixels
+                    return
+            render()
+            self.frames[w] = (frame, key)
+            self.stats["rendered"] += pixels
+
+        return draw
+
+    def flush(self):
+        # Through w.draw, a Mirror wraps it after the bar did
+        pending, self.pending = self.pending, {}
+        for w in pending:
+            w.draw()
+
+def active():
+    for screen in qtile.screens:
+        for gap in screen.gaps:
+            if isinstance(gap, Bar):
+                yield gap
+
+@contextmanager
+def batch():
+    batched = list(active())
+    for gap in batched:
+        gap.batching = True
+    try:
+        yield
+    finally:
+        for gap in batched:
+            gap.batching = False
+            gap.flush()
+
+def stats():
+    return {
+        "time": time.monotonic(),
+        "bars": [dict(gap.stats) for gap in active()],
+    }
+
+def expose():
+    expose_command("bar_stats", stats)
+
+def query(env):
+    out = subprocess.run(
+        ["qtile", "cmd-obj", "-o", "cmd", "-f", "bar_stats"],
+        env=env,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return ast.literal_eval(out.strip())
+
+def measure(config, env, seconds, warmup):
+    proc = subprocess.Popen(["qtile", "start", "-c", config], env=env)
+    try:
+        time.sleep(warmup)
+        before = query(env)
+        time.sleep(seconds)
+        after = query(env)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    elapsed = after["time"] - before["time"]
+    totals = {}
+    for old, new in zip(before["bars"], after["bars"]):
+        for name in new:
+            totals[name] = totals.get(name, 0) + new[name] - old[name]
+    return {name: value / elapsed for name, value in totals.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m utils.bars")
+    parser.add_argument("--display", default=":99")
+    parser.add_argument("--screen", default="1920x1080x24")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--config", default=os.path.abspath("config.py"))
+    args = parser.parse_args(argv)
+
+    xvfb = subprocess.Popen(["Xvfb", args.display, "-screen", "0", args.screen])
+    try:
+        time.sleep(1)
+        results = {}
+        for mode, full in (("full", "1"), ("tracked", "")):
+            env = dict(os.environ, DISPLAY=args.display, QTILE_FULL_REDRAW=full)
+            results[mode] = measure(args.config, env, args.seconds, args.warmup)
+    finally:
+        xvfb.terminate()
+        xvfb.wait()
+
+    print("{:<8} {:>12} {:>12} {:>12} {:>8}".format(
+        "", "rendered/s", "blitted/s", "skipped/s", "draws/s"
+    ))
+    for mode, rates in results.items():
+        print("{:<8} {:>12.0f} {:>12.0f} {:>12.0f} {:>8.2f}".format(
+            mode, rates["rendered"], rates["blitted"], rates["skipped"], rates["draws"]
+        ))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
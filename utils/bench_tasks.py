@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from libqtile.backend import base as backend
+
+from utils import images, tasks
+
+class Canvas(backend.Drawer):
+    def draw(self, *args, **kwargs):
+        # Nothing to copy offscreen, the cost is in rendering
+        pass
+
+class FakeInternal:
+    def create_drawer(self, width, height):
+        return Canvas(None, self, width, height)
+
+class FakeQtile:
+    def __init__(self):
+        self._eventloop = asyncio.get_running_loop()
+
+    def call_soon(self, func, *args):
+        pass
+
+    def call_later(self, delay, func, *args):
+        return self._eventloop.call_later(delay, func, *args)
+
+class FakeGroup:
+    def __init__(self):
+        self.windows = []
+        self.current_window = None
+
+class FakeWindow:
+    def __init__(self, wid, group):
+        self.wid = wid
+        self.group = group
+        self.name = "Window {}".format(wid)
+        self.urgent = False
+        self.minimized = False
+        self.maximized = False
+        self.floating = False
+        self.icons = {}
+
+class FakeScreen:
+    def __init__(self, group):
+        self.group = group
+
+class FakeBar:
+    def __init__(self, widget, group, width=1920, height=24):
+        self.widget = widget
+        self.screen = FakeScreen(group)
+        self.window = FakeInternal()
+        self.horizontal = True
+        self.width = self.size = width
+        self.height = height
+        self.background = "000000"
+        self.border_width = [0, 0, 0, 0]
+        self.queued = False
+        self.draws = 0
+        self.seconds = 0
+
+    def draw(self):
+        if not self.queued:
+            self.queued = True
+            asyncio.get_running_loop().call_soon(self._actual_draw)
+
+    def _actual_draw(self):
+        self.queued = False
+        start = time.perf_counter()
+        self.widget.draw()
+        self.seconds += time.perf_counter() - start
+        self.draws += 1
+
+async def run(cls, windows, rate, seconds, seed=0):
+    group = FakeGroup()
+    group.windows = [FakeWindow(wid, group) for wid in range(windows)]
+    group.current_window = group.windows[0]
+
+    widget = cls(max_title_width=150, txt_floating=" ", txt_maximized=" ")
+    bar = FakeBar(widget, group)
+    widget.offsetx = widget.offset = widget.offsety = 0
+    widget.length = bar.width
+    widget._configure(FakeQtile(), bar)
+    changed = getattr(widget, "title_changed", widget.update)
+
+    rng = random.Random(seed)
+    deadline = time.monotonic() + seconds
+    count = 0
+    while time.monotonic() < deadline:
+        window = rng.choice(group.windows)
+        count += 1
+        window.name = "{} - {}% loaded".format(window.name.split(" - ")[0], count)
+        changed(window)
+        await asyncio.sleep(1 / rate)
+    await asyncio.sleep(getattr(widget, "title_interval", 0))
+
+    widget.finalize()
+    return {"draws": bar.draws / seconds, "ms": bar.seconds * 1000 / seconds}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m utils.bench_tasks")
+    parser.add_argument("--windows", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args(argv)
+
+    print("{:<8} {:>10} {:>14}".format("", "draws/s", "draw ms/s"))
+    for name, cls in (("qtile", images.TaskList), ("cached", tasks.TaskList)):
+        result = asyncio.run(run(cls, args.windows, args.rate, args.seconds))
+        print("{:<8} {:>10.1f} {:>14.2f}".format(name, result["draws"], result["ms"]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import asyncio
+from contextlib import contextmanager
+
+from libqtile.lazy import lazy
+from libqtile.log_utils import logger
+
+repeat_window = 0.05
+
+class Coalescer:
+    def __init__(self, action, window=repeat_window):
+        # action(qtile, count)
+        self.action = action
+        self.window = window
+        self.count = 0
+        self.handle = None
+
+    def __call__(self, qtile):
+        if self.handle is not None:
+            self.count += 1
+            return
+        self._schedule(qtile)
+        self.action(qtile, 1)
+
+    def _schedule(self, qtile):
+        loop = asyncio.get_running_loop()
+        self.handle = loop.call_later(self.window, self.flush, qtile)
+
+    def flush(self, qtile):
+        count, self.count = self.count, 0
+        if not count:
+            self.handle = None
+            return
+        # Keep the window open, presses during this batch start the next one
+        self._schedule(qtile)
+        try:
+            self.action(qtile, count)
+        except Exception:
+            logger.exception("Coalesced key action failed")
+
+def repeat(action, window=repeat_window):
+    return lazy.function(Coalescer(action, window))
+
+@contextmanager
+def batched(group):
+    warps = []
+    group.layout_all = lambda warp=False: warps.append(warp)
+    try:
+        yield
+    finally:
+        del group.layout_all
+        if warps:
+            group.layout_all(any(warps))
+
+def layout(command, window=repeat_window):
+    def action(qtile, count):
+        run = getattr(qtile.current_layout, "cmd_" + command, None)
+        if run is None:
+            logger.warning("Layout has no command '%s'", command)
+            return
+        with batched(qtile.current_group):
+            for _ in range(count):
+                run()
+
+    return repeat(action, window)
@@ -0,0 +1,215 @@
+import math
+from collections import OrderedDict
+
+import cairocffi
+from libqtile import drawer, pangocffi
+
+from utils import expose_command, images
+
+class FontCache:
+    def __init__(self, metrics_limit=4096, surface_limit=8 * 1024 * 1024):
+        self.descriptions = {}
+        self.metrics = OrderedDict()
+        self.metrics_limit = metrics_limit
+        self.surfaces = images.SurfaceCache(surface_limit)
+        self.stats = {
+            "descriptions": {"hits": 0, "misses": 0},
+            "metrics": {"hits": 0, "misses": 0, "evictions": 0},
+        }
+
+    def description(self, family, size):
+        key = (family, size)
+        stats = self.stats["descriptions"]
+        if key in self.descriptions:
+            stats["hits"] += 1
+        else:
+            stats["misses"] += 1
+            desc = pangocffi.FontDescription.from_string(family)
+            desc.set_absolute_size(pangocffi.units_from_double(float(size)))
+            self.descriptions[key] = desc
+        return self.descriptions[key]
+
+    def measure(self, key, make):
+        stats = self.stats["metrics"]
+        size = self.metrics.get(key)
+        if size is not None:
+            self.metrics.move_to_end(key)
+            stats["hits"] += 1
+            return size
+
+        stats["misses"] += 1
+        size = self.metrics[key] = make()
+        if len(self.metrics) > self.metrics_limit:
+            self.metrics.popitem(last=False)
+            stats["evictions"] += 1
+        return size
+
+    def report(self):
+        return {
+            "descriptions": dict(
+                self.stats["descriptions"], entries=len(self.descriptions)
+            ),
+            "metrics": dict(self.stats["metrics"], entries=len(self.metrics)),
+            "surfaces": self.surfaces.report(),
+        }
+
+try:
+    cache
+except NameError:
+    cache = FontCache()
+    original = drawer.TextLayout
+
+class TextLayout(original):
+    def __init__(
+        self,
+        drawer,
+        text,
+        colour,
+        font_family,
+        font_size,
+        font_shadow,
+        wrap=True,
+        markup=False,
+    ):
+        self.drawer, self.colour = drawer, colour
+        layout = drawer.ctx.create_layout()
+        # Popups set the alignment on the pango layout itself, record it there
+        layout.set_alignment = self._aligned(layout.set_alignment)
+        layout.set_alignment(pangocffi.ALIGN_CENTER)
+        if not wrap:
+            layout.set_ellipsize(pangocffi.ELLIPSIZE_END)
+        self.family = font_family
+        self.size = font_size
+        layout.set_font_description(cache.description(font_family, font_size))
+        self.wrap = wrap
+        self.font_shadow = font_shadow
+        self.layout = layout
+        self.markup = markup
+        self._width = None
+        self.drawn = None
+        self.text = text
+
+    def _aligned(self, set_alignment):
+        def aligned(alignment):
+            self.alignment = alignment
+            set_alignment(alignment)
+
+        return aligned
+
+    def _sync(self):
+        if self.pending:
+            original.text.fset(self, self._text)
+            self.pending = False
+
+    @property
+    def text(self):
+        self._sync()
+        return original.text.fget(self)
+
+    @text.setter
+    def text(self, value):
+        self._text = "" if value is None else value
+        self.pending = True
+
+    def _key(self):
+        return (
+            self._text,
+            self.markup,
+            self.family,
+            self.size,
+            self.wrap,
+            self._width,
+        )
+
+    def _size(self):
+        def measure():
+            self._sync()
+            return self.layout.get_pixel_size()
+
+        return cache.measure(self._key(), measure)
+
+    @property
+    def width(self):
+        if self._width is not None:
+            return self._width
+        return self._size()[0]
+
+    @width.setter
+    def width(self, value):
+        original.width.fset(self, value)
+
+    @width.deleter
+    def width(self):
+        original.width.fdel(self)
+
+    @property
+    def height(self):
+        return self._size()[1]
+
+    @property
+    def font_family(self):
+        return self.family
+
+    @font_family.setter
+    def font_family(self, font):
+        if font != self.family:
+            self.family = font
+            self.layout.set_font_description(cache.description(font, self.size))
+
+    @property
+    def font_size(self):
+        return self.size
+
+    @font_size.setter
+    def font_size(self, size):
+        if size != self.size:
+            self.size = size
+            self.layout.set_font_description(cache.description(self.family, size))
+
+    def draw(self, x, y):
+        if not isinstance(self.colour, str) or isinstance(self.font_shadow, list):
+            self._sync()
+            original.draw(self, x, y)
+            return
+
+        key = self._key() + (self.alignment, self.colour, self.font_shadow)
+        if key not in cache.surfaces.surfaces and self.drawn != key:
+            self.drawn = key
+            self._sync()
+            original.draw(self, x, y)
+            return
+
+        width, height = self._size()
+        pad = math.ceil(height / 2)
+        surface = cache.surfaces.lookup(
+            key, lambda: self._render(width, height, pad)
+        )
+        ctx = self.drawer.ctx
+        ctx.save()
+        ctx.set_source_surface(surface, x - pad, y - pad)
+        ctx.paint()
+        ctx.restore()
+
+    def _render(self, width, height, pad):
+        self._sync()
+        surface = cairocffi.ImageSurface(
+            cairocffi.FORMAT_ARGB32, width + 2 * pad + 1, height + 2 * pad + 1
+        )
+        ctx = pangocffi.patch_cairo_context(cairocffi.Context(surface))
+        target, self.drawer.ctx = self.drawer.ctx, ctx
+        try:
+            original.draw(self, pad, pad)
+        finally:
+            self.drawer.ctx = target
+        return surface
+
+def install():
+    # Process wide: every drawer creates its layouts through
+    # libqtile.drawer.TextLayout, bars and popups alike
+    drawer.TextLayout = TextLayout
+
+def uninstall():
+    drawer.TextLayout = original
+
+def expose():
+    expose_command("font_cache_stats", cache.report)
@@ -0,0 +1,165 @@
+from array import array
+
+import cairocffi
+
+class Ring:
+    def __init__(self, values):
+        # Oldest first, head is the slot of the oldest value
+        self.data = array("d", reversed(values))
+        self.head = 0
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % len(self.data)
+
+    def ordered(self):
+        return self.data[self.head :] + self.data[: self.head]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return self.data[(self.head - 1 - index) % len(self.data)]
+
+    def __iter__(self):
+        return reversed(self.ordered())
+
+class RingGraph:
+    def __init__(self, **config):
+        self.auto = config.get("samples") == "auto"
+        if self.auto:
+            config["samples"] = 1
+        self.canvas = None
+        self.canvas_key = None
+        super().__init__(**config)
+
+    @property
+    def values(self):
+        return self.ring
+
+    @values.setter
+    def values(self, values):
+        self.ring = Ring(values)
+
+    def _configure(self, qtile, bar):
+        super()._configure(qtile, bar)
+        if self.auto and self.samples != int(self.graphwidth):
+            # Keep what was sampled so far on a reconfigure
+            newest = list(self.ring)[: int(self.graphwidth)]
+            self.samples = int(self.graphwidth)
+            self.values = newest + [0] * (self.samples - len(newest))
+
+    def _key(self):
+        return (
+            self.graphwidth,
+            self.graphheight,
+            self.maxvalue,
+            self.graph_color,
+            self.fill_color,
+            self.line_width,
+            self.start_pos,
+        )
+
+    def _incremental(self):
+        step = self.step()
+        return self.type != "box" and step >= 1 and step == int(step)
+
+    def _y(self, value, scale):
+        y = self.graphheight * value * scale
+        return self.graphheight - y if self.start_pos == "bottom" else y
+
+    def _base(self):
+        if self.start_pos == "bottom":
+            return self.graphheight - 1 + self.line_width / 2.0
+        return -1 + self.line_width / 2.0
+
+    def _trace(self, ctx, first):
+        step = self.step()
+        scale = 1.0 / (self.maxvalue or 1)
+        values = self.ring.ordered()[first:]
+        points = [
+            (step * (first + i), self._y(value, scale))
+            for i, value in enumerate(values)
+        ]
+
+        ctx.set_line_join(cairocffi.LINE_JOIN_ROUND)
+        ctx.set_line_width(self.line_width)
+        self.drawer.set_source_rgb(self.graph_color, ctx=ctx)
+        for x, y in points:
+            ctx.line_to(x, y)
+        if self.type == "line":
+            ctx.stroke()
+            return
+
+        ctx.stroke_preserve()
+        ctx.line_to(points[-1][0], self._base())
+        ctx.line_to(points[0][0], self._base())
+        self.drawer.set_source_rgb(self.fill_color, ctx=ctx)
+        ctx.fill()
+
+    def _render(self):
+        width, height = int(self.graphwidth), int(self.graphheight)
+        self.canvas = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, width, height)
+        self._trace(cairocffi.Context(self.canvas), 0)
+        self.canvas_key = self._key()
+
+    def _scroll(self, count):
+        shift = int(count * self.step())
+        edge = int(self.step() * (self.samples - count - 1))
+        canvas = cairocffi.ImageSurface(
+            cairocffi.FORMAT_ARGB32, self.canvas.get_width(), self.canvas.get_height()
+        )
+        ctx = cairocffi.Context(canvas)
+        ctx.set_source_surface(self.canvas, -shift, 0)
+        ctx.paint()
+        ctx.rectangle(edge, 0, canvas.get_width() - edge, canvas.get_height())
+        ctx.clip()
+        ctx.set_operator(cairocffi.OPERATOR_CLEAR)
+        ctx.paint()
+        ctx.set_operator(cairocffi.OPERATOR_OVER)
+        self._trace(ctx, max(self.samples - count - 2, 0))
+        self.canvas = canvas
+
+    def push(self, value):
+        if self.lag_cycles > self.samples:
+            # compensate lag by sending the same value up to
+            # the graph samples limit
+            self.lag_cycles = 1
+
+        count = min(self.samples, self.lag_cycles)
+        for _ in range(count):
+            self.ring.append(value)
+        if not self.fixed_upper_bound:
+            self.maxvalue = max(self.ring.data)
+
+        if count and self.canvas is not None and self.canvas_key == self._key():
+            if self._incremental() and count < self.samples - 1:
+                self._scroll(count)
+            else:
+                self.canvas = None
+        self.draw()
+
+    def draw(self):
+        if self.type == "box":
+            super().draw()
+            return
+        if self.canvas is None or self.canvas_key != self._key():
+            self._render()
+
+        self.drawer.clear(self.background or self.bar.background)
+        if self.border_width:
+            self.drawer.set_source_rgb(self.border_color)
+            self.drawer.ctx.set_line_width(self.border_width)
+            self.drawer.ctx.rectangle(
+                self.margin_x + self.border_width / 2.0,
+                self.margin_y + self.border_width / 2.0,
+                self.graphwidth + self.border_width,
+                self.bar.height - self.margin_y * 2 - self.border_width,
+            )
+            self.drawer.ctx.stroke()
+
+        x = self.margin_x + self.border_width
+        y = self.margin_y + self.border_width
+        self.drawer.ctx.set_source_surface(self.canvas, x, y)
+        self.drawer.ctx.paint()
+        self.drawer.draw(offsetx=self.offset, offsety=self.offsety, width=self.width)
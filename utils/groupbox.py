@@ -0,0 +1,156 @@
+import cairocffi
+from libqtile import pangocffi, widget
+
+from utils import images
+
+widths = {}
+
+class GroupBox(widget.GroupBox):
+    def __init__(self, **config):
+        widget.GroupBox.__init__(self, **config)
+        self.painted = {}
+        self.geometry = None
+        self.stats = {"draws": 0, "painted": 0, "rendered": 0}
+
+    def box_width(self, groups):
+        width = 0
+        for group in groups:
+            key = (group.label, self.font, self.fontsize)
+            if key not in widths:
+                del self.layout.width
+                self.layout.text = group.label
+                widths[key] = self.layout.width
+            width = max(width, widths[key])
+        return width + self.padding_x * 2 + self.borderwidth * 2
+
+    def state(self, group):
+        # The colours and highlight qtile's GroupBox.draw picks for a group
+        highlighted = False
+        block = self.highlight_method == "block"
+        line = self.highlight_method == "line"
+        urgent = self.group_has_urgent(group)
+
+        if urgent and self.urgent_alert_method == "text":
+            text_color = self.urgent_text
+        elif group.windows:
+            text_color = self.active
+        else:
+            text_color = self.inactive
+
+        if group.screen:
+            if self.highlight_method == "text":
+                border = None
+                text_color = self.this_current_screen_border
+            else:
+                if self.block_highlight_text_color:
+                    text_color = self.block_highlight_text_color
+                if self.bar.screen.group.name == group.name:
+                    if self.qtile.current_screen == self.bar.screen:
+                        border = self.this_current_screen_border
+                        highlighted = True
+                    else:
+                        border = self.this_screen_border
+                elif self.qtile.current_screen == group.screen:
+                    border = self.other_current_screen_border
+                else:
+                    border = self.other_screen_border
+        elif urgent and self.urgent_alert_method in ("border", "block", "line"):
+            border = self.urgent_border
+            block = block or self.urgent_alert_method == "block"
+            line = line or self.urgent_alert_method == "line"
+        else:
+            border = None
+
+        return (border, text_color, block, line, highlighted)
+
+    def boxes(self):
+        offset = self.margin_x
+        for group in self.groups:
+            width = self.box_width([group])
+            yield offset, (group.label, width, self.state(group))
+            offset += width + self.spacing
+
+    def content_key(self):
+        return (self.length, self.background or self.bar.background) + tuple(
+            key for _, key in self.boxes()
+        )
+
+    def style(self):
+        highlight = self.highlight_color
+        return (
+            self.bar.height,
+            self.background or self.bar.background,
+            self.font,
+            self.fontsize,
+            self.fontshadow,
+            tuple(highlight) if isinstance(highlight, list) else highlight,
+            self.rounded,
+            self.borderwidth,
+            self.padding_y,
+            self.margin_y,
+            self.center_aligned,
+        )
+
+    def render(self, label, width, state):
+        border, text_color, block, line, highlighted = state
+        surface = cairocffi.ImageSurface(
+            cairocffi.FORMAT_ARGB32, width, self.bar.height
+        )
+        ctx = pangocffi.patch_cairo_context(cairocffi.Context(surface))
+        ctx.set_operator(cairocffi.OPERATOR_SOURCE)
+        self.drawer.set_source_rgb(self.background or self.bar.background, ctx=ctx)
+        ctx.paint()
+        ctx.set_operator(cairocffi.OPERATOR_OVER)
+
+        original, self.drawer.ctx = self.drawer.ctx, ctx
+        try:
+            self.drawbox(
+                0,
+                label,
+                border,
+                text_color,
+                highlight_color=self.highlight_color,
+                width=width,
+                rounded=self.rounded,
+                block=block,
+                line=line,
+                highlighted=highlighted,
+            )
+        finally:
+            self.drawer.ctx = original
+        self.stats["rendered"] += 1
+        return surface
+
+    def draw(self):
+        self.stats["draws"] += 1
+        background = self.background or self.bar.background
+        geometry = (self.length, self.drawer.width, self.drawer.height, background)
+        if (
+            self.qtile.core.name != "x11"
+            or self.drawer.mirrors
+            or geometry != self.geometry
+        ):
+            self.drawer.clear(background)
+            self.painted = {}
+            self.geometry = geometry
+
+        style = self.style()
+        painted = {}
+        for offset, key in self.boxes():
+            painted[offset] = key
+            if self.painted.get(offset) == key:
+                continue
+            surface = images.cache.lookup(
+                ("groupbox",) + style + key, lambda: self.render(*key)
+            )
+            ctx = self.drawer.ctx
+            ctx.save()
+            ctx.set_operator(cairocffi.OPERATOR_SOURCE)
+            ctx.set_source_surface(surface, offset, 0)
+            ctx.rectangle(offset, 0, key[1], self.bar.height)
+            ctx.fill()
+            ctx.restore()
+            self.stats["painted"] += 1
+
+        self.painted = painted
+        self.drawer.draw(offsetx=self.offset, offsety=self.offsety, width=self.width)
@@ -0,0 +1,206 @@
+import glob
+import os
+from collections import OrderedDict
+
+import cairocffi
+from libqtile import hook, widget
+from libqtile.images import get_cairo_surface
+from libqtile.log_utils import logger
+
+from utils import expose_command
+
+icon_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "icons"
+)
+
+def footprint(surface):
+    return surface.get_stride() * surface.get_height()
+
+def decode(path, width=None, height=None):
+    with open(path, "rb") as f:
+        return get_cairo_surface(f.read(), width, height)[0]
+
+def scaled(surface, width, height):
+    target = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, width, height)
+    ctx = cairocffi.Context(target)
+    ctx.scale(width / surface.get_width(), height / surface.get_height())
+    ctx.set_source_surface(surface)
+    ctx.get_source().set_filter(cairocffi.FILTER_BEST)
+    ctx.paint()
+    return target
+
+def pattern(surface, x=0, y=0):
+    result = cairocffi.SurfacePattern(surface)
+    if x or y:
+        matrix = cairocffi.Matrix()
+        matrix.translate(-x, -y)
+        result.set_matrix(matrix)
+    return result
+
+class SurfaceCache:
+    def __init__(self, limit=32 * 1024 * 1024):
+        self.limit = limit
+        self.surfaces = OrderedDict()
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def lookup(self, key, make):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.stats["hits"] += 1
+            return surface
+
+        self.stats["misses"] += 1
+        surface = make()
+        self.surfaces[key] = surface
+        self.size += footprint(surface)
+        while self.size > self.limit and len(self.surfaces) > 1:
+            _, old = self.surfaces.popitem(last=False)
+            self.size -= footprint(old)
+            self.stats["evictions"] += 1
+        return surface
+
+    def load(self, path, width=None, height=None, scale=1):
+        # A missing side keeps the aspect ratio, scale applies to both
+        path = os.path.expanduser(path)
+        mtime = os.stat(path).st_mtime
+        natural = self.lookup((path, mtime, None), lambda: decode(path))
+
+        w0, h0 = natural.get_width(), natural.get_height()
+        if width is None and height is None:
+            width, height = w0, h0
+        elif width is None:
+            width = w0 * height / h0
+        elif height is None:
+            height = h0 * width / w0
+        size = (max(round(width * scale), 1), max(round(height * scale), 1))
+        if size == (w0, h0):
+            return natural
+
+        def rasterise():
+            if path.endswith(".svg"):
+                surface = decode(path, *size)
+                if (surface.get_width(), surface.get_height()) == size:
+                    return surface
+            return scaled(natural, *size)
+
+        return self.lookup((path, mtime, size), rasterise)
+
+    def window(self, wid, icons, size):
+        def rasterise():
+            # The icon closest to the wanted size, like TaskList picks it
+            name, data = min(
+                icons.items(), key=lambda i: abs(size - int(i[0].split("x")[0]))
+            )
+            width, height = map(int, name.split("x"))
+            surface = cairocffi.ImageSurface.create_for_data(
+                data, cairocffi.FORMAT_ARGB32, width, height
+            )
+            return scaled(surface, max(round(width * size / height), 1), size)
+
+        return self.lookup(("window", wid, size), rasterise)
+
+    def discard_window(self, wid):
+        for key in [k for k in self.surfaces if k[:2] == ("window", wid)]:
+            self.size -= footprint(self.surfaces.pop(key))
+
+    def report(self):
+        return dict(self.stats, entries=len(self.surfaces), bytes=self.size)
+
+try:
+    cache
+except NameError:
+    cache = SurfaceCache()
+
+@hook.subscribe.net_wm_icon_change
+def _icon_changed(window):
+    cache.discard_window(window.wid)
+
+@hook.subscribe.client_killed
+def _killed(window):
+    cache.discard_window(window.wid)
+
+def prewarm(height, scale=1, directory=icon_dir):
+    # Rasterise the layout icons before the first bar asks for them
+    for path in glob.glob(os.path.join(directory, "layout-*.png")):
+        try:
+            cache.load(path, height=height)
+            cache.load(path, height=height, scale=scale)
+        except (cairocffi.Error, OSError):
+            logger.exception("Unable to rasterise %s", path)
+
+def expose():
+    expose_command("image_cache_stats", cache.report)
+
+class Raster:
+    def __init__(self, surface):
+        self.width = surface.get_width()
+        self.height = surface.get_height()
+        self.pattern = pattern(surface)
+
+
+class Image(widget.Image):
+    def _update_image(self):
+        if self.rotate:
+            widget.Image._update_image(self)
+            return
+
+        self.img = None
+        if not self.filename:
+            logger.warning("Image filename not set!")
+            return
+        self.filename = os.path.expanduser(self.filename)
+        if not os.path.exists(self.filename):
+            logger.warning("Image does not exist: %s", self.filename)
+            return
+
+        if not self.scale:
+            surface = cache.load(self.filename)
+        elif self.bar.horizontal:
+            height = self.bar.height - self.margin_y * 2
+            surface = cache.load(self.filename, height=height)
+        else:
+            width = self.bar.width - self.margin_x * 2
+            surface = cache.load(self.filename, width=width)
+        self.img = Raster(surface)
+
+
+class CurrentLayoutIcon(widget.CurrentLayoutIcon):
+    def _setup_images(self):
+        height = self.bar.height - 1
+        for layout_name in self._get_layout_names():
+            path = self.find_icon_file_path(layout_name)
+            if path is None:
+                logger.warning('No icon found for layout "%s"', layout_name)
+                path = self.find_icon_file_path("unknown")
+
+            try:
+                full = cache.load(path, height=height)
+                # self.scale was inverted by CurrentLayoutIcon.__init__
+                icon = cache.load(path, height=height, scale=1 / self.scale)
+            except (cairocffi.Error, OSError):
+                self.icons_loaded = False
+                logger.exception('Failed to load icon from file "%s"', path)
+                return
+
+            width = full.get_width()
+            if width > self.length:
+                self.length = width + self.actual_padding * 2
+            self.surfaces[layout_name] = pattern(
+                icon,
+                self.actual_padding + (width - icon.get_width()) / 2,
+                (height - icon.get_height()) / 2,
+            )
+
+        self.icons_loaded = True
+
+
+class TaskList(widget.TaskList):
+    def get_window_icon(self, window):
+        if not window.icons:
+            return None
+        if window.wid not in self._icons_cache:
+            surface = cache.window(window.wid, window.icons, self.icon_size)
+            self._icons_cache[window.wid] = pattern(surface)
+        return self._icons_cache[window.wid]
@@ -0,0 +1,255 @@
+import asyncio
+import ctypes
+import ctypes.util
+
+from libqtile import bar
+from libqtile.log_utils import logger
+from libqtile.widget import base
+from Xlib import X
+from Xlib import display as xdisplay
+
+UseCoreKbd = 0x0100
+StateNotify = 2
+GroupStateMask = 1 << 4
+
+class XkbState(ctypes.Structure):
+    _fields_ = [
+        ("group", ctypes.c_ubyte),
+        ("locked_group", ctypes.c_ubyte),
+        ("base_group", ctypes.c_ushort),
+        ("latched_group", ctypes.c_ushort),
+        ("mods", ctypes.c_ubyte),
+        ("base_mods", ctypes.c_ubyte),
+        ("latched_mods", ctypes.c_ubyte),
+        ("locked_mods", ctypes.c_ubyte),
+        ("compat_state", ctypes.c_ubyte),
+        ("grab_mods", ctypes.c_ubyte),
+        ("compat_grab_mods", ctypes.c_ubyte),
+        ("lookup_mods", ctypes.c_ubyte),
+        ("compat_lookup_mods", ctypes.c_ubyte),
+        ("ptr_buttons", ctypes.c_ushort),
+    ]
+
+
+class XkbStateNotifyEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("time", ctypes.c_ulong),
+        ("xkb_type", ctypes.c_int),
+        ("device", ctypes.c_int),
+        ("changed", ctypes.c_uint),
+        ("group", ctypes.c_int),
+    ]
+
+
+class XEvent(ctypes.Union):
+    _fields_ = [("type", ctypes.c_int), ("pad", ctypes.c_long * 24)]
+
+def libx11():
+    path = ctypes.util.find_library("X11")
+    if path is None:
+        raise OSError("libX11 not found")
+    lib = ctypes.CDLL(path)
+    lib.XOpenDisplay.restype = ctypes.c_void_p
+    lib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    for name in ("XCloseDisplay", "XConnectionNumber", "XPending", "XFlush"):
+        getattr(lib, name).argtypes = [ctypes.c_void_p]
+    lib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(XEvent)]
+    lib.XkbQueryExtension.argtypes = [ctypes.c_void_p] + [
+        ctypes.POINTER(ctypes.c_int)
+    ] * 5
+    lib.XkbSelectEventDetails.argtypes = [
+        ctypes.c_void_p,
+        ctypes.c_uint,
+        ctypes.c_uint,
+        ctypes.c_ulong,
+        ctypes.c_ulong,
+    ]
+    lib.XkbGetState.argtypes = [
+        ctypes.c_void_p,
+        ctypes.c_uint,
+        ctypes.POINTER(XkbState),
+    ]
+    lib.XkbLockGroup.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_uint]
+    return lib
+
+class Switcher:
+    def __init__(self, languages, options=None):
+        self.languages = list(languages)
+        self.options = options
+        self.group = 0
+        self.lib = None
+        self.display = None
+        self.event_base = None
+        self.subscribers = []
+
+    @property
+    def language(self):
+        return self.languages[self.group % len(self.languages)]
+
+    def start(self):
+        asyncio.create_task(self.upload())
+        try:
+            self.open()
+        except OSError as error:
+            logger.warning("XKB layout switching unavailable: %s", error)
+            self.close()
+
+    def open(self):
+        self.lib = libx11()
+        self.display = self.lib.XOpenDisplay(None)
+        if not self.display:
+            raise OSError("Unable to open the display")
+
+        opcode, event_base, error_base = (ctypes.c_int() for _ in range(3))
+        major, minor = ctypes.c_int(1), ctypes.c_int(0)
+        if not self.lib.XkbQueryExtension(
+            self.display,
+            ctypes.byref(opcode),
+            ctypes.byref(event_base),
+            ctypes.byref(error_base),
+            ctypes.byref(major),
+            ctypes.byref(minor),
+        ):
+            raise OSError("The X server has no XKB extension")
+        self.event_base = event_base.value
+
+        self.lib.XkbSelectEventDetails(
+            self.display, UseCoreKbd, StateNotify, GroupStateMask, GroupStateMask
+        )
+        state = XkbState()
+        self.lib.XkbGetState(self.display, UseCoreKbd, ctypes.byref(state))
+        self.group = state.locked_group
+        self.lib.XFlush(self.display)
+
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self.lib.XConnectionNumber(self.display), self._read)
+
+    def close(self):
+        if self.display:
+            asyncio.get_running_loop().remove_reader(
+                self.lib.XConnectionNumber(self.display)
+            )
+            self.lib.XCloseDisplay(self.display)
+        self.display = None
+
+    def layouts(self):
+        # The layouts of the current keymap, as setxkbmap -query reports them
+        try:
+            conn = xdisplay.Display()
+        except Exception:
+            return None
+        try:
+            root = conn.screen().root
+            names = root.get_full_property(
+                conn.intern_atom("_XKB_RULES_NAMES"), X.AnyPropertyType
+            )
+        finally:
+            conn.close()
+        if names is None:
+            return None
+        fields = names.value.decode().split("\0")
+        return fields[2].split(",") if len(fields) > 2 else None
+
+    async def upload(self):
+        # Only on a fresh X session, a config reload finds the keymap in place
+        if self.layouts() == self.languages:
+            return
+        command = ["setxkbmap", "-layout", ",".join(self.languages)]
+        if self.options:
+            command += ["-option", "", "-option", self.options]
+        try:
+            proc = await asyncio.create_subprocess_exec(*command)
+        except OSError:
+            logger.exception("Unable to upload the keymap")
+            return
+        await proc.wait()
+
+    def set(self, qtile, group):
+        group %= len(self.languages)
+        if self.display is None:
+            qtile.cmd_spawn("setxkbmap " + self.languages[group])
+            self._changed(group)
+            return
+        self.lib.XkbLockGroup(self.display, UseCoreKbd, group)
+        self.lib.XFlush(self.display)
+
+    def next(self, qtile):
+        self.set(qtile, self.group + 1)
+
+    def prev(self, qtile):
+        self.set(qtile, self.group - 1)
+
+    def _read(self):
+        event = XEvent()
+        while self.lib.XPending(self.display):
+            self.lib.XNextEvent(self.display, ctypes.byref(event))
+            if event.type != self.event_base:
+                continue
+            notify = ctypes.cast(
+                ctypes.byref(event), ctypes.POINTER(XkbStateNotifyEvent)
+            ).contents
+            if notify.xkb_type == StateNotify and notify.changed & GroupStateMask:
+                self._changed(notify.group)
+
+    def _changed(self, group):
+        if group == self.group:
+            return
+        self.group = group
+        for callback in list(self.subscribers):
+            try:
+                callback(self)
+            except Exception:
+                logger.exception("Keyboard layout subscriber failed")
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        callback(self)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+def start(languages, options=None):
+    global running
+    try:
+        running.close()
+    except NameError:
+        pass
+
+    running = Switcher(languages, options)
+    running.start()
+    return running
+
+class KeyboardLayout(base._TextBox):
+    defaults = [
+        ("switcher", None, "Switcher to follow, the running one if None"),
+        ("display_map", {}, "Custom display of layouts, e.g. {'us': 'EN'}"),
+    ]
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "", width=bar.CALCULATED, **config)
+        self.add_defaults(KeyboardLayout.defaults)
+        self.add_callbacks(
+            {
+                "Button1": lambda: self.switcher.next(self.qtile),
+                "Button3": lambda: self.switcher.prev(self.qtile),
+            }
+        )
+
+    def _configure(self, qtile, bar):
+        base._TextBox._configure(self, qtile, bar)
+        self.switcher = self.switcher or running
+
+    def timer_setup(self):
+        self.switcher.subscribe(self.on_change)
+
+    def finalize(self):
+        self.switcher.unsubscribe(self.on_change)
+        base._TextBox.finalize(self)
+
+    def on_change(self, switcher):
+        self.update(self.display_map.get(switcher.language, switcher.language))
@@ -0,0 +1,75 @@
+from libqtile.log_utils import logger
+from Xlib import display as xdisplay
+from Xlib import error as xerror
+from Xlib.ext import randr
+
+class Topology:
+    def __init__(self):
+        self.display = None
+        self.timestamp = None
+        self.monitors = []
+
+    @property
+    def root(self):
+        if self.display is None:
+            self.display = xdisplay.Display()
+        return self.display.screen().root
+
+    def _query(self, root, resources):
+        version = self.display.xrandr_query_version()
+        if (version.major_version, version.minor_version) >= (1, 5) and hasattr(
+            root, "xrandr_get_monitors"
+        ):
+            # RandR 1.5 describes every active monitor in a single request
+            return [
+                (m.x, m.y, m.width_in_pixels, m.height_in_pixels)
+                for m in root.xrandr_get_monitors(is_active=True).monitors
+            ]
+
+        monitors = []
+        for output in resources.outputs:
+            info = self.display.xrandr_get_output_info(
+                output, resources.config_timestamp
+            )
+            if info.crtc:
+                crtc = self.display.xrandr_get_crtc_info(
+                    info.crtc, resources.config_timestamp
+                )
+                monitors.append((crtc.x, crtc.y, crtc.width, crtc.height))
+        return monitors
+
+    def get(self):
+        try:
+            root = self.root
+            if not self.display.has_extension(randr.extname):
+                return []
+            # Unlike get_screen_resources this doesn't make the server re-probe
+            resources = root.xrandr_get_screen_resources_current()
+            if resources.config_timestamp != self.timestamp:
+                self.monitors = self._query(root, resources)
+                self.timestamp = resources.config_timestamp
+        except (xerror.DisplayError, xerror.ConnectionClosedError, xerror.XError):
+            logger.exception("Unable to query the monitor topology")
+            self.close()
+        return self.monitors
+
+    def count(self):
+        # always setup at least one monitor
+        return max(len(self.get()), 1)
+
+    def invalidate(self):
+        self.timestamp = None
+
+    def close(self):
+        if self.display is not None:
+            try:
+                self.display.close()
+            except xerror.ConnectionClosedError:
+                pass
+        self.display = None
+        self.timestamp = None
+
+try:
+    topology
+except NameError:
+    topology = Topology()
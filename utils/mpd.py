@@ -0,0 +1,410 @@
+import asyncio
+import os
+import select
+import shlex
+import socketserver
+import sys
+import threading
+from collections import defaultdict
+
+from libqtile import bar
+from libqtile.log_utils import logger
+from libqtile.widget import base
+
+class MPDError(Exception):
+    pass
+
+def quote(arg):
+    return '"{}"'.format(str(arg).replace("\\", "\\\\").replace('"', '\\"'))
+
+async def read(reader):
+    # One response as a list of (key, value), idle reports a key more than once
+    response = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("MPD closed the connection")
+        line = line.decode().rstrip("\n")
+        if line == "OK":
+            return response
+        if line.startswith("ACK "):
+            raise MPDError(line)
+        key, _, value = line.partition(": ")
+        response.append((key, value))
+
+def write(writer, name, *args):
+    writer.write(" ".join([name, *map(quote, args)]).encode() + b"\n")
+
+class Client:
+    subsystems = ("player", "mixer", "options")
+
+    def __init__(self, host=None, port=None, backoff=1, max_backoff=60):
+        host = host or os.environ.get("MPD_HOST", "localhost")
+        self.password, _, self.host = host.rpartition("@")
+        self.port = int(port or os.environ.get("MPD_PORT", 6600))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.status = {}
+        self.song = {}
+        self.connected = False
+        self.connections = 0
+        self.subscribers = []
+        self.queue = None
+        self.pending = []
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._run())
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.connected = False
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        self.start()
+        callback(self)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self):
+        for callback in list(self.subscribers):
+            try:
+                callback(self)
+            except Exception:
+                logger.exception("MPD subscriber failed")
+
+    def send(self, name, *args):
+        # Returns a future for the response
+        self.start()
+        if not self.connected:
+            raise MPDError("Not connected to MPD")
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((name, args, future))
+        return future
+
+    def _fire(self, name, *args):
+        def check(future):
+            if not future.cancelled() and future.exception():
+                logger.warning("MPD command '%s' failed: %s", name, future.exception())
+
+        self.send(name, *args).add_done_callback(check)
+
+    def toggle(self):
+        if self.status.get("state") == "play":
+            self._fire("pause", 1)
+        else:
+            self._fire("play")
+
+    def next(self):
+        self._fire("next")
+
+    def prev(self):
+        self._fire("previous")
+
+    def stop(self):
+        self._fire("stop")
+
+    def volume(self, change):
+        volume = int(self.status.get("volume", -1))
+        if volume < 0:
+            raise MPDError("MPD has no mixer")
+        volume = min(max(volume + change, 0), 100)
+        # Optimistic, a key press right after this one builds on it
+        self.status["volume"] = str(volume)
+        self._fire("setvol", volume)
+
+    async def _connect(self):
+        if self.host.startswith("/"):
+            reader, writer = await asyncio.open_unix_connection(self.host)
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+
+        hello = await reader.readline()
+        if not hello.startswith(b"OK MPD "):
+            writer.close()
+            raise MPDError("Not an MPD server: {!r}".format(hello))
+        if self.password:
+            await self._command(reader, writer, "password", self.password)
+        self.connections += 1
+        return reader, writer
+
+    async def _command(self, reader, writer, name, *args):
+        write(writer, name, *args)
+        return dict(await read(reader))
+
+    async def _refresh(self, reader, writer, song):
+        status = await self._command(reader, writer, "status")
+        if song or status.get("songid") != self.status.get("songid"):
+            self.song = await self._command(reader, writer, "currentsong")
+        self.status = status
+        self.publish()
+
+    async def _send_queued(self, reader, writer):
+        while not self.queue.empty():
+            self.pending.append(self.queue.get_nowait())
+        while self.pending:
+            name, args, future = self.pending[0]
+            try:
+                response = await self._command(reader, writer, name, *args)
+            except MPDError as error:
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                if not future.done():
+                    future.set_result(response)
+            self.pending.pop(0)
+
+    async def _idle(self, reader, writer):
+        await self._refresh(reader, writer, song=True)
+        while True:
+            write(writer, "idle", *self.subsystems)
+            idle = asyncio.ensure_future(read(reader))
+            queued = asyncio.ensure_future(self.queue.get())
+            try:
+                await asyncio.wait((idle, queued), return_when=asyncio.FIRST_COMPLETED)
+                if queued.done():
+                    self.pending.append(queued.result())
+                    # MPD ignores a noidle once idle has returned, so the
+                    # next response is still the one of the idle
+                    write(writer, "noidle")
+                changed = {value for key, value in await idle}
+            finally:
+                queued.cancel()
+            await self._send_queued(reader, writer)
+            if changed:
+                await self._refresh(reader, writer, song="player" in changed)
+
+    async def _run(self):
+        delay = self.backoff
+        while True:
+            try:
+                reader, writer = await self._connect()
+            except (OSError, MPDError) as error:
+                logger.warning("Unable to connect to MPD: %s", error)
+            else:
+                self.connected = True
+                delay = self.backoff
+                try:
+                    await self._idle(reader, writer)
+                except (OSError, MPDError) as error:
+                    logger.warning("Lost the MPD connection: %s", error)
+                finally:
+                    self.connected = False
+                    writer.close()
+                    self._drop()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    def _drop(self):
+        while not self.queue.empty():
+            self.pending.append(self.queue.get_nowait())
+        for name, args, future in self.pending:
+            if not future.done():
+                future.set_exception(MPDError("Lost the MPD connection"))
+        self.pending = []
+        self.status = {}
+        self.song = {}
+        self.publish()
+
+try:
+    client.close()
+except NameError:
+    pass
+
+client = Client()
+
+class NowPlaying(base._TextBox):
+    defaults = [
+        ("client", None, "Client to read from, the shared one if None"),
+        ("format", "{artist} - {title}", "Display format, any tag or status field"),
+        ("paused_format", "{artist} - {title}", "Display format while paused"),
+        ("stopped_text", "", "Text when stopped or MPD is unreachable"),
+        ("max_chars", 40, "Truncate the text to this many characters"),
+    ]
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "", width=bar.CALCULATED, **config)
+        self.add_defaults(NowPlaying.defaults)
+        self.client = self.client or client
+        self.add_callbacks(
+            {
+                "Button1": self.client.toggle,
+                "Button4": self.client.prev,
+                "Button5": self.client.next,
+            }
+        )
+
+    def timer_setup(self):
+        self.client.subscribe(self.on_change)
+
+    def finalize(self):
+        self.client.unsubscribe(self.on_change)
+        base._TextBox.finalize(self)
+
+    def on_change(self, client):
+        state = client.status.get("state")
+        if state not in ("play", "pause") or not client.song:
+            self.update(self.stopped_text)
+            return
+
+        fields = defaultdict(str, client.status)
+        fields.update({key.lower(): value for key, value in client.song.items()})
+        if not fields["title"]:
+            fields["title"] = os.path.basename(fields["file"])
+        text = (self.format if state == "play" else self.paused_format).format_map(
+            fields
+        )
+        if len(text) > self.max_chars:
+            text = text[: self.max_chars - 1] + "…"
+        self.update(text)
+
+class FakeMPDHandler(socketserver.StreamRequestHandler):
+    # Unbuffered, a noidle read ahead with idle would never be seen by select
+    rbufsize = 0
+
+    def handle(self):
+        self.changed = set()
+        with self.server.lock:
+            self.server.connections += 1
+            self.server.handlers.append(self)
+        self.wfile.write(b"OK MPD 0.23.5\n")
+        try:
+            for line in self.rfile:
+                command = shlex.split(line.decode())
+                if not command or command[0] == "close":
+                    return
+                if command[0] == "idle":
+                    self.idle(set(command[1:]))
+                    continue
+                with self.server.lock:
+                    self.server.commands.append(command)
+                    reply = self.server.reply(*command)
+                self.wfile.write(reply.encode())
+        finally:
+            with self.server.lock:
+                self.server.handlers.remove(self)
+
+    def idle(self, subsystems):
+        while True:
+            with self.server.lock:
+                changed = {s for s in self.changed if not subsystems or s in subsystems}
+                self.changed -= changed
+            if changed:
+                reply = "".join("changed: {}\n".format(s) for s in sorted(changed))
+                self.wfile.write(reply.encode() + b"OK\n")
+                return
+            if select.select([self.connection], [], [], 0.02)[0]:
+                # noidle, or the client went away
+                if self.rfile.readline():
+                    self.wfile.write(b"OK\n")
+                return
+
+
+class FakeMPDServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0)):
+        socketserver.ThreadingTCPServer.__init__(self, address, FakeMPDHandler)
+        self.state = {"volume": "50", "state": "stop", "song": "0", "songid": "1"}
+        self.commands = []
+        self.connections = 0
+        self.handlers = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def notify(self, subsystem):
+        for handler in self.handlers:
+            handler.changed.add(subsystem)
+
+    def set(self, subsystem, **state):
+        with self.lock:
+            self.state.update(state)
+            self.notify(subsystem)
+
+    def reply(self, name, *args):
+        state = self.state
+        if name == "noidle":
+            # Outside of idle MPD ignores it without a reply
+            return ""
+        if name == "status":
+            return "".join("{}: {}\n".format(k, v) for k, v in state.items()) + "OK\n"
+        if name == "currentsong":
+            song = "file: music/{0:02}.flac\nTitle: Song {0}\nArtist: Fake\n"
+            return song.format(int(state["song"])) + "OK\n"
+        if name == "setvol":
+            state["volume"] = args[0]
+            self.notify("mixer")
+        elif name in ("play", "pause", "stop", "next", "previous"):
+            if name == "play":
+                state["state"] = "play"
+            elif name == "pause":
+                state["state"] = "pause" if args[0] == "1" else "play"
+            elif name == "stop":
+                state["state"] = "stop"
+            else:
+                step = 1 if name == "next" else -1
+                state["song"] = str(max(int(state["song"]) + step, 0))
+                state["songid"] = str(int(state["song"]) + 1)
+            self.notify("player")
+        elif name != "ping":
+            return "ACK [5@0] {{{}}} unknown command \"{}\"\n".format(name, name)
+        return "OK\n"
+
+async def wait_for(condition, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+async def check(server):
+    mpd = Client("127.0.0.1", server.port)
+    mpd.start()
+    ok = await wait_for(lambda: mpd.connected and mpd.status)
+    mpd.toggle()
+    mpd.volume(+5)
+    mpd.next()
+    ok = ok and await wait_for(lambda: mpd.song.get("Title") == "Song 1")
+    # Commands racing with idle changes each get their own response
+    for volume in range(60, 70):
+        server.set("mixer", volume=str(volume))
+        ok = ok and "volume" in await mpd.send("status")
+    server.set("mixer", volume="80")
+    ok = ok and await wait_for(lambda: mpd.status.get("volume") == "80")
+    print("state:", server.state)
+    print("cached:", mpd.status.get("state"), mpd.song)
+    print("{} commands over {} connection(s)".format(
+        len(server.commands), server.connections
+    ))
+    mpd.close()
+    return ok and server.connections == 1
+
+def main():
+    server = FakeMPDServer().start()
+    try:
+        return 0 if asyncio.run(check(server)) else 1
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import asyncio
+import random
+
+from libqtile import widget
+from libqtile.log_utils import logger
+
+from utils.sampling import _Sampled
+
+fields = {
+    "index": "index",
+    "count": "count",
+    "temp": "temperature.gpu",
+    "fan_speed": "fan.speed",
+    "perf": "pstate",
+    "utilization": "utilization.gpu",
+    "memory_used": "memory.used",
+}
+
+class NvidiaSmi:
+    def __init__(self, command="nvidia-smi", bus_id=None, interval=2, restart=10):
+        self.command = command
+        self.bus_id = bus_id
+        self.interval = interval
+        # Seconds to wait before starting nvidia-smi again if it exits
+        self.restart = restart
+
+    @property
+    def name(self):
+        return "nvidia:" + (self.bus_id or "all")
+
+    @property
+    def args(self):
+        args = [
+            self.command,
+            "--query-gpu=" + ",".join(fields.values()),
+            "--format=csv,noheader,nounits",
+            "--loop-ms={}".format(int(self.interval * 1000)),
+        ]
+        if self.bus_id:
+            args += ["-i", self.bus_id]
+        return args
+
+    def parse(self, line):
+        values = [value.strip() for value in line.split(",")]
+        if len(values) != len(fields):
+            return None
+        return dict(zip(fields, values))
+
+    async def _read(self, stdout):
+        gpus = {}
+        while True:
+            line = await stdout.readline()
+            if not line:
+                return
+
+            gpu = self.parse(line.decode())
+            if gpu is None:
+                continue
+            gpus[gpu["index"]] = gpu
+            if len(gpus) >= int(gpu["count"]):
+                yield [gpus[index] for index in sorted(gpus, key=int)]
+                gpus = {}
+
+    async def stream(self):
+        while True:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *self.args,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+            except OSError:
+                logger.warning("Unable to start %s", self.command)
+                return
+
+            try:
+                async for gpus in self._read(proc.stdout):
+                    yield gpus
+            finally:
+                if proc.returncode is None:
+                    try:
+                        proc.kill()
+                    except ProcessLookupError:
+                        pass
+            await proc.wait()
+            await asyncio.sleep(self.restart)
+
+class FakeSmi:
+    name = "nvidia:fake"
+
+    def __init__(self, gpus=1, interval=2, temp=45):
+        self.gpus = gpus
+        self.interval = interval
+        self.temp = temp
+
+    async def stream(self):
+        temps = [self.temp] * self.gpus
+        while True:
+            batch = []
+            for index in range(self.gpus):
+                temps[index] = min(max(temps[index] + random.randint(-2, 2), 30), 95)
+                batch.append(
+                    {
+                        "index": str(index),
+                        "count": str(self.gpus),
+                        "temp": str(temps[index]),
+                        "fan_speed": str(max(temps[index] - 30, 0)),
+                        "perf": "P2",
+                        "utilization": str(random.randint(0, 100)),
+                        "memory_used": str(random.randint(500, 4000)),
+                    }
+                )
+            yield batch
+            await asyncio.sleep(self.interval)
+
+class NvidiaSensors(_Sampled, widget.NvidiaSensors):
+    defaults = [
+        ("collector", None, "NvidiaSmi or FakeSmi to read from, nvidia-smi if None"),
+        ("command", "nvidia-smi", "nvidia-smi command for the default collector"),
+    ]
+
+    def __init__(self, **config):
+        _Sampled.__init__(self, **config)
+        self.add_defaults(NvidiaSensors.defaults)
+        if self.collector is None:
+            self.collector = NvidiaSmi(
+                command=self.command,
+                bus_id=self.gpu_bus_id or None,
+                interval=self.update_interval,
+            )
+
+    @property
+    def source(self):
+        return self.collector.name
+
+    def timer_setup(self):
+        self.sampler.source(self.source, stream=self.collector.stream)
+        _Sampled.timer_setup(self)
+
+    def poll(self):
+        gpus = self.sampler.get(self.source)
+        if not gpus:
+            return ""
+
+        try:
+            text = " - ".join(self.format.format(**gpu) for gpu in gpus)
+        except KeyError:
+            return "Wrong sensor name"
+
+        alert = any(
+            gpu["temp"].isdigit() and int(gpu["temp"]) > self.threshold for gpu in gpus
+        )
+        self.layout.colour = self.foreground_alert if alert else self.foreground
+        return text
+
+    def on_sample(self, value):
+        self.update(self.poll())
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+
+from libqtile.log_utils import logger
+from libqtile.utils import get_cache_dir
+
+def report_file():
+    return os.path.join(get_cache_dir(), "config-profile.json")
+
+def baseline_file():
+    return os.path.join(get_cache_dir(), "config-profile.baseline.json")
+
+def load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class Profiler:
+    def __init__(self):
+        self.enabled = bool(os.environ.get("QTILE_PROFILE"))
+        self.started = self.last = time.perf_counter()
+        self.phases = []
+
+    def _record(self, name, seconds):
+        self.phases.append({"name": name, "seconds": seconds})
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self._record(name, now - self.last)
+        self.last = now
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.last = time.perf_counter()
+            self._record(name, self.last - start)
+
+    def report(self):
+        return {
+            "time": time.time(),
+            "total": time.perf_counter() - self.started,
+            "phases": self.phases,
+        }
+
+    def finish(self, budgets=None, tolerance=1.25):
+        if not self.enabled:
+            return []
+
+        report = self.report()
+        failures = check(report, budgets or {}, load(baseline_file()), tolerance)
+        with open(report_file(), "w") as f:
+            json.dump(report, f, indent=2)
+
+        for failure in failures:
+            logger.warning("Config load over budget: %s", failure)
+        return failures
+
+def timings(report):
+    return [("total", report["total"])] + [
+        (phase["name"], phase["seconds"]) for phase in report["phases"]
+    ]
+
+def check(report, budgets, baseline=None, tolerance=1.25, slack=0.005):
+    previous = {}
+    for name, seconds in timings(baseline) if baseline else []:
+        previous[name] = max(previous.get(name, 0), seconds)
+
+    failures = []
+    for name, seconds in timings(report):
+        budget = budgets.get(name)
+        if budget is not None and seconds > budget:
+            failures.append(
+                "{} took {:.1f}ms, budget is {:.1f}ms".format(
+                    name, seconds * 1000, budget * 1000
+                )
+            )
+        if name in previous and seconds > previous[name] * tolerance + slack:
+            failures.append(
+                "{} regressed from {:.1f}ms to {:.1f}ms".format(
+                    name, previous[name] * 1000, seconds * 1000
+                )
+            )
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m utils.profiler")
+    parser.add_argument("report", nargs="?", default=report_file())
+    parser.add_argument("--baseline", default=baseline_file())
+    parser.add_argument("--budget", action="append", default=[], metavar="PHASE=SECONDS")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = load(args.report)
+    if report is None:
+        print("No report at {}, start qtile with QTILE_PROFILE=1".format(args.report))
+        return 2
+
+    if args.save_baseline:
+        shutil.copyfile(args.report, args.baseline)
+        return 0
+
+    for name, seconds in timings(report):
+        print("{:<20} {:8.1f}ms".format(name, seconds * 1000))
+
+    budgets = {}
+    for budget in args.budget:
+        name, _, seconds = budget.partition("=")
+        budgets[name] = float(seconds)
+
+    failures = check(report, budgets, load(args.baseline), args.tolerance)
+    for failure in failures:
+        print("FAIL", failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
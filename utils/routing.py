@@ -0,0 +1,307 @@
+import re
+import time
+from collections import deque
+from operator import attrgetter
+
+from libqtile import hook, layout
+from libqtile.backend.base import Static
+from libqtile.log_utils import logger
+
+from utils import expose_command
+
+indexed = ("title", "wm_class", "wm_instance_class", "role", "wm_type")
+
+# Global flags like (?i) are only allowed at the start of the merged regex
+inline_flags = re.compile(r"\(\?[aiLmsux]+\)")
+
+def literals(name, value):
+    if isinstance(value, (list, tuple)):
+        if name == "wm_class" and all(isinstance(v, str) for v in value):
+            return list(value)
+        return None
+    if not isinstance(value, re.Pattern):
+        return None
+
+    found = re.fullmatch(r"\^\((.*)\)\$", value.pattern, re.S)
+    if found is None or value.flags & ~re.UNICODE:
+        return None
+    parts = re.split(r"(?<!\\)\|", found[1])
+    parts = [re.sub(r"\\(.)", r"\1", part) for part in parts]
+    if "|".join(map(re.escape, parts)) != found[1]:
+        return None
+    return parts
+
+class Rule:
+    def __init__(self, order, match, target):
+        self.order = order
+        self.match = match
+        self.target = target
+        # qtile keeps the properties of a Match in a private dict
+        self.properties = dict(match._rules)
+        # (property, values) for rules that can be indexed
+        self.key = None
+        # (property, regex) for rules on a single pattern
+        self.pattern = None
+
+        for name in indexed:
+            values = literals(name, self.properties.get(name, []))
+            if values:
+                self.key = (name, values)
+                break
+        # Matching the indexed value is all there is to check
+        self.exact = self.key is not None and len(self.properties) == 1
+
+        if self.key is None and len(self.properties) == 1:
+            name, value = next(iter(self.properties.items()))
+            if (
+                name in indexed
+                and isinstance(value, re.Pattern)
+                and not value.groups
+                and not inline_flags.search(value.pattern)
+            ):
+                self.pattern = (name, value)
+
+    def __str__(self):
+        properties = ", ".join(
+            "{}={!r}".format(name, getattr(value, "pattern", value))
+            for name, value in self.properties.items()
+        )
+        return "Match({}) -> {}".format(properties, self.target)
+
+class RoutingTable:
+    def __init__(self, rules):
+        self.rules = rules
+        self.index = {}
+        self.automata = {}
+        self.linear = []
+        self.properties = set()
+
+        patterns = {}
+        for rule in rules:
+            if rule.key:
+                name, values = rule.key
+                for value in values:
+                    self.index.setdefault((name, value), []).append(rule)
+            elif rule.pattern:
+                name, pattern = rule.pattern
+                patterns.setdefault((name, pattern.flags), []).append(rule)
+            else:
+                self.linear.append(rule)
+            self.properties.update(rule.properties)
+
+        # Only rules with the same flags share a regex
+        for (name, flags), pattern_rules in patterns.items():
+            automaton = self._automaton(pattern_rules, flags)
+            self.automata.setdefault(name, []).append(automaton)
+        self.report = self._check()
+
+    def _automaton(self, rules, flags):
+        # Alternatives are tried in order, so the named group that matched is
+        # the earliest rule
+        alternatives = []
+        for rule in rules:
+            pattern = rule.pattern[1]
+            alternatives.append("(?P<r{}>{})".format(rule.order, pattern.pattern))
+        by_group = {"r{}".format(rule.order): rule for rule in rules}
+        return re.compile("|".join(alternatives), flags), by_group
+
+    def _winner(self, name, value):
+        # The rule that takes every window with this value
+        rules = [rule for rule in self.index.get((name, value), ()) if rule.exact]
+        for automaton, by_group in self.automata.get(name, ()):
+            matched = automaton.match(value)
+            if matched:
+                rules.append(by_group[matched.lastgroup])
+        return min(rules, key=lambda rule: rule.order, default=None)
+
+    def _check(self):
+        report = []
+        for rule in self.rules:
+            if not rule.key:
+                continue
+            name, values = rule.key
+            shadowed = []
+            for value in values:
+                winner = self._winner(name, value)
+                if winner and winner.order < rule.order:
+                    shadowed.append((value, winner))
+
+            if shadowed and len(shadowed) == len(values):
+                report.append("{} is unreachable".format(rule))
+                continue
+            for value, winner in shadowed:
+                if winner.target != rule.target:
+                    report.append(
+                        "{}={!r} conflicts, {} wins over {}".format(
+                            name, value, winner, rule
+                        )
+                    )
+        return report
+
+    def values(self, window):
+        # Each property some rule looks at is fetched once
+        values = {}
+        if "title" in self.properties:
+            values["title"] = [window.name]
+        if "wm_class" in self.properties or "wm_instance_class" in self.properties:
+            wm_class = window.get_wm_class() or []
+            values["wm_class"] = wm_class
+            values["wm_instance_class"] = wm_class[:1]
+        if "role" in self.properties:
+            values["role"] = [window.get_wm_role()]
+        if "wm_type" in self.properties:
+            values["wm_type"] = [window.get_wm_type()]
+        return values
+
+    def candidates(self, values):
+        candidates = list(self.linear)
+        for name, found in values.items():
+            automata = self.automata.get(name, ())
+            for value in found:
+                if value is None:
+                    continue
+                candidates.extend(self.index.get((name, value), ()))
+                for automaton, by_group in automata:
+                    matched = automaton.match(value)
+                    if matched:
+                        candidates.append(by_group[matched.lastgroup])
+        candidates.sort(key=attrgetter("order"))
+        return candidates
+
+    def route(self, window, values=None):
+        if values is None:
+            values = self.values(window)
+        for rule in self.candidates(values):
+            if rule.exact or rule.match.compare(window):
+                return rule.target
+        return None
+
+    def route_linear(self, window):
+        for rule in self.rules:
+            if rule.match.compare(window):
+                return rule.target
+        return None
+
+class Snapshot:
+    def __init__(self, title=None, wm_class=None, role=None, wm_type=None):
+        self.title = title
+        self.wm_class = wm_class
+        self.role = role
+        self.wm_type = wm_type
+        self.wid = None
+        self.reads = 0
+
+    @property
+    def name(self):
+        self.reads += 1
+        return self.title
+
+    @classmethod
+    def from_values(cls, values):
+        def first(name):
+            return (values.get(name) or [None])[0]
+
+        return cls(
+            first("title"), values.get("wm_class"), first("role"), first("wm_type")
+        )
+
+    def get_wm_class(self):
+        self.reads += 1
+        return self.wm_class
+
+    def get_wm_role(self):
+        self.reads += 1
+        return self.role
+
+    def get_wm_type(self):
+        self.reads += 1
+        return self.wm_type
+
+    def get_pid(self):
+        return None
+
+    def is_transient_for(self):
+        return None
+
+def steam_burst(size=40):
+    titles = ["Steam", "Friends List", "News", "Guard", "Screenshot Uploader"]
+    trace = []
+    for i in range(size):
+        if i % 4 == 3:
+            trace.append(Snapshot("Game", ["steam_app_{}".format(i), "steam_app"]))
+        else:
+            title = titles[i % len(titles)]
+            trace.append(Snapshot(title, ["steamwebhelper", "Steam"], wm_type="normal"))
+    return trace
+
+def benchmark(tables, trace, repeat=100):
+    # Microseconds and property reads per window, for all tables together
+    results = {"windows": len(trace)}
+    for name in ("indexed", "linear"):
+        elapsed = 0
+        for window in trace:
+            window.reads = 0
+        for table in tables:
+            route = table.route if name == "indexed" else table.route_linear
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for window in trace:
+                    route(window)
+            elapsed += time.perf_counter() - start
+        results[name + "_us"] = elapsed / (repeat * len(trace)) * 1e6
+        results[name + "_reads"] = sum(w.reads for w in trace) / (repeat * len(trace))
+    return results
+
+class Router:
+    def __init__(self, groups, floating=None):
+        rules = []
+        for group in groups:
+            for match in group.matches or []:
+                rules.append(Rule(len(rules), match, group.name))
+            group.matches = []
+        self.table = RoutingTable(rules)
+        self.floating = floating
+        self.recent = deque(maxlen=200)
+
+    @property
+    def tables(self):
+        if self.floating is None:
+            return [self.table]
+        return [self.table, self.floating.table]
+
+    def report(self):
+        return [line for table in self.tables for line in table.report]
+
+    def on_client_new(self, window):
+        # Like DGroups: no static windows, nor ones already placed on restart or
+        # by _NET_WM_DESKTOP
+        if isinstance(window, Static) or window.group is not None:
+            return
+        values = self.table.values(window)
+        self.recent.append(Snapshot.from_values(values))
+        group = self.table.route(window, values)
+        if group:
+            window.togroup(group)
+
+    def benchmark(self, repeat=100):
+        return benchmark(self.tables, list(self.recent) or steam_burst(), repeat)
+
+class Floating(layout.Floating):
+    def __init__(self, **config):
+        layout.Floating.__init__(self, **config)
+        self.table = RoutingTable(
+            [Rule(i, match, True) for i, match in enumerate(self.float_rules)]
+        )
+
+    def match(self, win):
+        return bool(self.table.route(win))
+
+def attach(groups, floating=None):
+    router = Router(groups, floating)
+    for line in router.report():
+        logger.warning("Window rule: %s", line)
+
+    hook.subscribe.client_new(router.on_client_new)
+    expose_command("routing_report", router.report)
+    expose_command("routing_benchmark", router.benchmark)
+    return router
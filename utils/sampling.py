@@ -0,0 +1,256 @@
+import asyncio
+import time
+
+import psutil
+from libqtile import qtile, widget
+from libqtile.log_utils import logger
+from libqtile.widget.volume import re_vol
+
+from utils import bars, graphs
+from utils.scheduling import scheduler
+
+class Source:
+    def __init__(self, read, interval, stream=None):
+        self.read = read
+        self.interval = interval
+        # Async generator function for sources that push their own values
+        self.stream = stream
+        self.task = None
+        self.value = None
+        self.due = 0
+        self.subscribers = []
+
+
+class Sampler:
+    def __init__(self, tick=1):
+        self.tick = tick
+        self.sources = {}
+        self.task = None
+
+    def source(self, name, read=None, interval=None, stream=None):
+        if name not in self.sources:
+            self.sources[name] = Source(read, interval or self.tick, stream)
+        return self.sources[name]
+
+    def subscribe(self, name, callback):
+        source = self.sources[name]
+        source.subscribers.append(callback)
+        if source.stream:
+            if source.task is None or source.task.done():
+                source.task = asyncio.create_task(self._stream(name, source))
+        elif self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def unsubscribe(self, name, callback):
+        source = self.sources[name]
+        if callback in source.subscribers:
+            source.subscribers.remove(callback)
+        if not source.subscribers and source.task:
+            source.task.cancel()
+            source.task = None
+
+    def get(self, name):
+        # Widgets read their initial values before the loop is running
+        source = self.sources[name]
+        if source.value is None and source.read:
+            if not asyncio.iscoroutinefunction(source.read):
+                source.value = source.read()
+        return source.value
+
+    def publish(self, name, value):
+        source = self.sources[name]
+        source.value = value
+        for callback in list(source.subscribers):
+            try:
+                callback(value)
+            except Exception:
+                logger.exception("Sampler subscriber for '%s' failed", name)
+
+    async def _sample(self, name, source):
+        try:
+            if asyncio.iscoroutinefunction(source.read):
+                return True, await source.read()
+            return True, source.read()
+        except Exception:
+            logger.exception("Sampler source '%s' failed", name)
+            return False, None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            active = {
+                n: s for n, s in self.sources.items() if s.subscribers and s.read
+            }
+            if not active:
+                break
+
+            now = loop.time()
+            # A grid wakeup may land a hair before the due time
+            due = [(n, s) for n, s in active.items() if s.due <= now + 0.05]
+            for _, source in due:
+                source.due = now + source.interval
+
+            results = await asyncio.gather(*(self._sample(n, s) for n, s in due))
+            with bars.batch():
+                for (name, _), (ok, value) in zip(due, results):
+                    if ok:
+                        self.publish(name, value)
+            qtile.core.flush()
+
+            next_due = min(s.due for s in active.values())
+            await asyncio.sleep(scheduler.delay(next_due - loop.time()))
+        self.task = None
+
+    async def _stream(self, name, source):
+        try:
+            async for value in source.stream():
+                self.publish(name, value)
+                qtile.core.flush()
+        except Exception:
+            logger.exception("Sampler stream '%s' failed", name)
+
+def amixer(command):
+    async def read():
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await proc.communicate()
+        return out.decode() if proc.returncode == 0 else ""
+
+    return read
+
+
+sampler = Sampler()
+
+sampler.source("cpu", psutil.cpu_times)
+sampler.source("cpu_percpu", lambda: psutil.cpu_times(percpu=True))
+sampler.source("memory", psutil.virtual_memory)
+sampler.source("net", lambda: psutil.net_io_counters(pernic=True))
+sampler.source("temperatures", psutil.sensors_temperatures, interval=2)
+
+class _Sampled:
+    source = None
+
+    def __init__(self, **config):
+        self.sampler = sampler
+        super().__init__(**config)
+
+    def timer_setup(self):
+        self.sampler.subscribe(self.source, self.on_sample)
+
+    def finalize(self):
+        self.sampler.unsubscribe(self.source, self.on_sample)
+        super().finalize()
+
+    def on_sample(self, value):
+        pass
+
+
+class _SampledGraph(_Sampled, graphs.RingGraph):
+    def on_sample(self, value):
+        # Same lag detection as _Graph.update(), minus the timer
+        newtime = time.time()
+        self.lag_cycles = int((newtime - self.oldtime) / self.frequency)
+        self.oldtime = newtime
+        self.update_graph()
+
+class CPUGraph(_SampledGraph, widget.CPUGraph):
+    @property
+    def source(self):
+        return "cpu_percpu" if isinstance(self.core, int) else "cpu"
+
+    def _getvalues(self):
+        cpu = self.sampler.get(self.source)
+        if isinstance(self.core, int):
+            cpu = cpu[self.core]
+
+        return (
+            int(cpu.user * 100),
+            int(cpu.nice * 100),
+            int(cpu.system * 100),
+            int(cpu.idle * 100),
+        )
+
+class MemoryGraph(_SampledGraph, widget.MemoryGraph):
+    source = "memory"
+
+    def _getvalues(self):
+        mem = self.sampler.get(self.source)
+        return {
+            "MemTotal": int(mem.total / 1024 / 1024),
+            "MemFree": int(mem.free / 1024 / 1024),
+            "Buffers": int(mem.buffers / 1024 / 1024),
+            "Cached": int(mem.cached / 1024 / 1024),
+        }
+
+class NetGraph(_SampledGraph, widget.NetGraph):
+    source = "net"
+
+    def _get_values(self):
+        net = self.sampler.get(self.source)[self.interface]
+        if self.bandwidth_type == "up":
+            return net.bytes_sent
+        return net.bytes_recv
+
+class ThermalSensor(_Sampled, widget.ThermalSensor):
+    source = "temperatures"
+
+    def get_temp_sensors(self):
+        temperature_list = {}
+        temps = self.sampler.get(self.source)
+        unit = "°C" if self.metric else "°F"
+        empty_index = 0
+        for kernel_module in temps:
+            for sensor in temps[kernel_module]:
+                label = sensor.label
+                if not label:
+                    label = "{}-{}".format(kernel_module or "UNKNOWN", empty_index)
+                    empty_index += 1
+                current = sensor.current
+                if not self.metric:
+                    current = current * 9 / 5 + 32
+                temperature_list[label] = (str(round(current, 1)), unit)
+
+        return temperature_list
+
+    def on_sample(self, value):
+        self.tick()
+
+class Volume(_Sampled, widget.Volume):
+    @property
+    def source(self):
+        return "amixer:" + " ".join(self._get_volume_command())
+
+    def _get_volume_command(self):
+        if self.get_volume_command:
+            return self.get_volume_command
+        return self.create_amixer_command("sget", self.channel)
+
+    def timer_setup(self):
+        self.sampler.source(
+            self.source, amixer(self._get_volume_command()), self.update_interval
+        )
+        _Sampled.timer_setup(self)
+        if self.theme_path:
+            self.setup_images()
+
+    def get_volume(self):
+        mixer_out = self.sampler.get(self.source)
+        if not mixer_out or "[off]" in mixer_out:
+            return -1
+
+        volgroups = re_vol.search(mixer_out)
+        if volgroups:
+            return int(volgroups.groups()[0])
+        return -1
+
+    def on_sample(self, value):
+        self.on_volume(self.get_volume())
+
+    def on_volume(self, vol):
+        if vol != self.volume:
+            self.volume = vol
+            self._update_drawer()
+            self.bar.draw()
@@ -0,0 +1,182 @@
+import asyncio
+import time
+
+from libqtile import qtile, widget
+from libqtile.log_utils import logger
+from Xlib import error as xerror
+from Xlib.ext import dpms, screensaver
+
+from utils import bars, monitors
+
+class Entry:
+    def __init__(self, when, callback, args):
+        self._when = when
+        self.callback = callback
+        self.args = args
+        self._cancelled = False
+
+    def when(self):
+        return self._when
+
+    def cancel(self):
+        self._cancelled = True
+
+    def cancelled(self):
+        return self._cancelled
+
+
+class Scheduler:
+    def __init__(self, tick=1, idle_tick=30, idle_after=300, idle_check=2):
+        self.tick = tick
+        self.idle_tick = idle_tick
+        self.idle_after = idle_after
+        self.idle_check = idle_check
+        self.slots = {}
+        self.idle = False
+        self.checked = 0
+        self.awake_until = 0
+        self.watch = None
+        self.stats = {"wakeups": 0, "updates": 0}
+
+    @property
+    def grid(self):
+        return self.idle_tick if self.idle else self.tick
+
+    def slot(self, seconds):
+        # The nearest grid point, timers that fire a little late don't drift
+        now = time.time()
+        slot = round((now + seconds) / self.grid) * self.grid
+        return slot if slot > now else slot + self.grid
+
+    def delay(self, seconds):
+        return self.slot(seconds) - time.time()
+
+    def add(self, seconds, callback, *args):
+        loop = asyncio.get_running_loop()
+        slot = self.slot(seconds)
+        entry = Entry(loop.time() + slot - time.time(), callback, args)
+        if slot not in self.slots:
+            self.slots[slot] = []
+            loop.call_at(entry.when(), self._fire, slot)
+        self.slots[slot].append(entry)
+        return entry
+
+    def _fire(self, slot):
+        entries = self.slots.pop(slot, [])
+        self._run(entries)
+        self._check()
+
+    def _run(self, entries):
+        entries = [entry for entry in entries if not entry.cancelled()]
+        if not entries:
+            return
+        self.stats["wakeups"] += 1
+        self.stats["updates"] += len(entries)
+        with bars.batch():
+            for entry in entries:
+                entry.cancel()
+                try:
+                    entry.callback(*entry.args)
+                except Exception:
+                    logger.exception("Scheduled update failed")
+        qtile.core.flush()
+
+    def screen_idle(self):
+        if time.monotonic() < self.awake_until:
+            return False
+        try:
+            root = monitors.topology.root
+            display = monitors.topology.display
+            idle = None
+            timeouts = [self.idle_after]
+            if display.has_extension(screensaver.extname):
+                info = root.screensaver_query_info()
+                if info.state == screensaver.StateOn:
+                    return True
+                idle = info.idle / 1000
+                if idle >= self.idle_after:
+                    return True
+                timeouts.append(display.get_screen_saver().timeout)
+            if display.has_extension(dpms.extname):
+                level = display.dpms_info()
+                if level.state and level.power_level != dpms.DPMSModeOn:
+                    return True
+                if level.state:
+                    dpms_timeouts = display.dpms_get_timeouts()
+                    timeouts += [
+                        dpms_timeouts.standby_timeout,
+                        dpms_timeouts.suspend_timeout,
+                        dpms_timeouts.off_timeout,
+                    ]
+            if idle is not None:
+                # A timeout of 0 is disabled
+                remaining = min(t for t in timeouts if t) - idle
+                self.awake_until = time.monotonic() + remaining
+            return False
+        except (xerror.DisplayError, xerror.XError):
+            return False
+        except xerror.ConnectionClosedError:
+            monitors.topology.close()
+            return False
+
+    def _check(self):
+        now = time.monotonic()
+        if now - self.checked < self.tick:
+            return
+        self.checked = now
+        idle = self.screen_idle()
+        if idle and not self.idle:
+            self.watch = asyncio.get_running_loop().call_later(
+                self.idle_check, self._watch
+            )
+        self.idle = idle
+
+    def _watch(self):
+        self.watch = None
+        self.idle = self.screen_idle()
+        if self.idle:
+            self.watch = asyncio.get_running_loop().call_later(
+                self.idle_check, self._watch
+            )
+            return
+
+        # Back from idle, nothing waits for its coarse slot
+        slots, self.slots = self.slots, {}
+        self._run([entry for entries in slots.values() for entry in entries])
+
+scheduler = Scheduler()
+
+class Scheduled:
+    def timeout_add(self, seconds, method, method_args=()):
+        entry = scheduler.add(seconds, self._wrapper, method, *method_args)
+        self._futures.append(entry)
+        return entry
+
+
+class Clock(Scheduled, widget.Clock):
+    pass
+
+
+class Polled(Scheduled):
+    def timer_setup(self):
+        # Polled in the scheduled entry rather than in an executor, whose
+        # done-callback would draw the bar after the batch was flushed
+        try:
+            result = self.poll()
+        except Exception:
+            logger.exception("poll() raised exceptions, not rescheduling")
+            return
+        if result is None:
+            logger.warning("poll() returned None, not rescheduling")
+            return
+        self.update(result)
+        if self.update_interval is not None:
+            self.timeout_add(self.update_interval, self.timer_setup)
+
+
+class Memory(Polled, widget.Memory):
+    pass
+
+
+class Net(Polled, widget.Net):
+    pass
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import time
+
+import psutil
+from libqtile import hook, qtile
+from libqtile.config import DropDown, EzKey, KeyChord, ScratchPad
+from libqtile.lazy import lazy
+from libqtile.log_utils import logger
+
+from utils import expose_command
+
+class Entry:
+    def __init__(
+        self,
+        name,
+        command,
+        key=None,
+        chord=None,
+        desc=None,
+        prewarm="demand",
+        memory_limit=None,
+        **dropdown,
+    ):
+        self.name = name
+        self.command = command
+        self.key = key
+        self.chord = chord
+        self.desc = desc or name.capitalize()
+        self.prewarm = prewarm
+        self.memory_limit = memory_limit
+        self.dropdown = dropdown
+
+
+class Stats:
+    def __init__(self):
+        self.requested = None
+        self.spawn_latency = None
+        self.first_map = None
+        self.toggles = 0
+
+class Scratchpads:
+    def __init__(
+        self,
+        group,
+        entries,
+        stagger=3,
+        interval=30,
+        idle_load=1.0,
+        evict_after=1800,
+        memory_limit=85,
+        **dropdown,
+    ):
+        self.group = group
+        self.entries = {entry.name: entry for entry in entries}
+        self.dropdown = dropdown
+        self.stagger = stagger
+        # Seconds between checks for idle time and memory pressure
+        self.interval = interval
+        self.idle_load = idle_load
+        self.evict_after = evict_after
+        # Used memory in percent from which unused dropdowns are evicted
+        self.memory_limit = memory_limit
+        self.stats = {name: Stats() for name in self.entries}
+        self.pending = set()
+        self.warm = {}
+        self.evicted = set()
+        self.task = None
+
+    def scratchpad(self, **config):
+        dropdowns = [
+            DropDown(entry.name, entry.command, **dict(self.dropdown, **entry.dropdown))
+            for entry in self.entries.values()
+        ]
+        return ScratchPad(self.group, dropdowns, **config)
+
+    def keys(self, chord=None, name="Scratchpads"):
+        def key(combination, entry):
+            return EzKey(
+                combination,
+                lazy.function(self.toggle, entry.name),
+                desc=entry.desc + " Scratchpad",
+            )
+
+        entries = self.entries.values()
+        keys = [key(entry.key, entry) for entry in entries if entry.key]
+        chorded = sorted((e for e in entries if e.chord), key=lambda e: e.chord)
+        if chord and chorded:
+            keys.append(
+                KeyChord(*chord, [key(e.chord, e) for e in chorded], name=name)
+            )
+        return keys
+
+    @property
+    def pad(self):
+        return qtile.groups_map[self.group]
+
+    @property
+    def dropdowns(self):
+        return self.pad.dropdowns
+
+    def toggle(self, qtile, name):
+        # A pre-warm that is still starting up is shown instead of hidden
+        if name in self.pending:
+            self.pending.discard(name)
+            self.pad._to_hide.remove(name)
+        self.evicted.discard(name)
+        self.stats[name].toggles += 1
+        self._toggle(name)
+
+    def _toggle(self, name):
+        stats = self.stats[name]
+        if name in self.dropdowns or stats.requested is not None:
+            self.pad.cmd_dropdown_toggle(name)
+            return
+
+        start = time.monotonic()
+        self.pad.cmd_dropdown_toggle(name)
+        stats.spawn_latency = time.monotonic() - start
+        stats.requested = start
+
+    def spawn(self, name):
+        if name in self.dropdowns or name in self.evicted:
+            return
+        self.pending.add(name)
+        # Hidden by the ScratchPad's own client_new, before the window is mapped
+        self.pad._to_hide.append(name)
+        self._toggle(name)
+
+    def on_client_managed(self, window):
+        dropdowns = self.dropdowns
+        for name, stats in self.stats.items():
+            if stats.requested is None or name not in dropdowns:
+                continue
+            if dropdowns[name].window is not window:
+                continue
+
+            stats.first_map = time.monotonic() - stats.requested
+            stats.requested = None
+            if name in self.pending:
+                self.pending.discard(name)
+                self.warm[name] = time.monotonic()
+
+    def on_client_focus(self, window):
+        # Once a warm dropdown is used it is no longer a candidate for eviction
+        dropdowns = self.dropdowns
+        for name in list(self.warm):
+            if name not in dropdowns or dropdowns[name].window is window:
+                del self.warm[name]
+
+    def rss(self, name):
+        # Resident memory in MiB, None if it isn't running
+        if name not in self.dropdowns:
+            return None
+        try:
+            pid = self.dropdowns[name].window.get_pid()
+            return psutil.Process(pid).memory_info().rss / 1024 / 1024
+        except (psutil.Error, TypeError, ValueError):
+            return None
+
+    def idle(self):
+        return os.getloadavg()[0] < self.idle_load
+
+    def evict(self):
+        pressure = psutil.virtual_memory().percent >= self.memory_limit
+        now = time.monotonic()
+        for name, since in list(self.warm.items()):
+            limit = self.entries[name].memory_limit
+            over_limit = limit is not None and (self.rss(name) or 0) > limit
+            if not over_limit and not (pressure and now - since >= self.evict_after):
+                continue
+
+            logger.info("Evicting unused scratchpad '%s'", name)
+            if name in self.dropdowns:
+                self.dropdowns[name].window.kill()
+            del self.warm[name]
+            self.evicted.add(name)
+
+    def by_policy(self, policy):
+        return [name for name, e in self.entries.items() if e.prewarm == policy]
+
+    async def _run(self):
+        # The config is loaded before qtile has created the groups
+        await asyncio.sleep(self.stagger)
+        for name in self.by_policy("eager"):
+            self.spawn(name)
+            await asyncio.sleep(self.stagger)
+
+        idle = self.by_policy("idle")
+        while True:
+            delay = self.interval
+            if idle and self.idle():
+                self.spawn(idle.pop(0))
+                delay = self.stagger
+            self.evict()
+            await asyncio.sleep(delay)
+
+    def state(self, name):
+        for state, names in (
+            ("pending", self.pending),
+            ("warm", self.warm),
+            ("evicted", self.evicted),
+        ):
+            if name in names:
+                return state
+        return "running" if name in self.dropdowns else "stopped"
+
+    def report(self):
+        return {
+            name: {
+                "prewarm": self.entries[name].prewarm,
+                "state": self.state(name),
+                "toggles": stats.toggles,
+                "spawn_latency": stats.spawn_latency,
+                "first_map": stats.first_map,
+                "rss_mib": self.rss(name),
+            }
+            for name, stats in self.stats.items()
+        }
+
+    def start(self):
+        hook.subscribe.client_managed(self.on_client_managed)
+        hook.subscribe.client_focus(self.on_client_focus)
+        self.task = asyncio.create_task(self._run())
+        expose_command("scratchpad_stats", self.report)
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+
+def start(scratchpads):
+    global running
+    try:
+        running.stop()
+    except NameError:
+        pass
+
+    running = scratchpads
+    running.start()
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from libqtile.log_utils import logger
+
+from utils import expose_command
+
+class Job:
+    def __init__(self, name, command, after=(), wait=False):
+        self.name = name
+        self.command = command
+        self.after = list(after)
+        self.wait = wait
+        self.status = "pending"
+        self.latency = None
+        self.returncode = None
+        self.pid = None
+        self.ok = False
+        self.ready = asyncio.Event()
+
+    def done(self, ok, status=None):
+        self.ok = ok
+        if status:
+            self.status = status
+        self.ready.set()
+
+    def info(self):
+        return {
+            "command": self.command,
+            "after": self.after,
+            "status": self.status,
+            "latency": self.latency,
+            "returncode": self.returncode,
+            "pid": self.pid,
+        }
+
+class Autostart:
+    def __init__(self, jobs):
+        self.jobs = {job.name: job for job in jobs}
+        self.started = None
+        self.tasks = []
+
+    def launch(self):
+        self.started = time.monotonic()
+        for name in self._unrunnable():
+            logger.error(
+                "Autostart job '%s' has missing or circular dependencies", name
+            )
+            self.jobs[name].done(False, "skipped")
+
+        for job in self.jobs.values():
+            if job.status == "pending":
+                self.tasks.append(asyncio.create_task(self._run(job)))
+
+    def _unrunnable(self):
+        # Whatever is left after a topological sort can never start
+        ordered = set()
+        remaining = dict(self.jobs)
+        progress = True
+        while progress:
+            progress = False
+            for name, job in list(remaining.items()):
+                if all(dep in ordered for dep in job.after):
+                    ordered.add(name)
+                    del remaining[name]
+                    progress = True
+        return list(remaining)
+
+    async def _run(self, job):
+        for dep in job.after:
+            await self.jobs[dep].ready.wait()
+        if not all(self.jobs[dep].ok for dep in job.after):
+            job.done(False, "skipped")
+            return
+
+        try:
+            proc = await asyncio.create_subprocess_shell(
+                job.command, stdin=asyncio.subprocess.DEVNULL
+            )
+        except OSError:
+            logger.exception("Autostart job '%s' failed to start", job.name)
+            job.done(False, "failed")
+            return
+
+        job.latency = time.monotonic() - self.started
+        job.pid = proc.pid
+        job.status = "running"
+        if not job.wait:
+            job.done(True)
+
+        job.returncode = await proc.wait()
+        job.status = "exited" if job.returncode == 0 else "failed"
+        if job.wait:
+            job.done(job.returncode == 0)
+
+    def status(self):
+        return {name: job.info() for name, job in self.jobs.items()}
+
+def launch(jobs):
+    autostart = Autostart(jobs)
+    autostart.launch()
+    expose_command("autostart_status", autostart.status)
+    return autostart
@@ -0,0 +1,195 @@
+import time
+
+from libqtile import hook
+
+from utils import images
+
+class Task:
+    def __init__(self, layout):
+        self.layout = layout
+        self.key = None
+        self.width = 0
+
+
+class TaskList(images.TaskList):
+    defaults = [
+        ("title_interval", 0.5, "Minimum seconds between title redraws of a window"),
+    ]
+
+    def __init__(self, **config):
+        images.TaskList.__init__(self, **config)
+        self.add_defaults(TaskList.defaults)
+        self.tasks = {}
+        self.renamed = {}
+        self.deferred = {}
+        self.stats = {"draws": 0, "layouts": 0, "deferred": 0}
+
+    def setup_hooks(self):
+        hook.subscribe.client_name_updated(self.title_changed)
+        hook.subscribe.focus_change(self.update)
+        hook.subscribe.float_change(self.update)
+        hook.subscribe.client_urgent_hint_changed(self.update)
+
+        hook.subscribe.net_wm_icon_change(self.invalidate_cache)
+        hook.subscribe.client_killed(self.forget)
+
+    def state(self, window):
+        return (
+            window.name,
+            window.minimized,
+            window.maximized,
+            window.floating,
+            window is window.group.current_window,
+        )
+
+    def task(self, window):
+        task = self.tasks.get(window.wid)
+        if task is None:
+            layout = self.drawer.textlayout(
+                "",
+                self.foreground,
+                self.font,
+                self.fontsize,
+                self.fontshadow,
+                wrap=False,
+            )
+            task = self.tasks[window.wid] = Task(layout)
+
+        key = self.state(window)
+        if task.key != key:
+            name = self.get_taskname(window)
+            task.layout.markup = self.markup
+            del task.layout.width
+            task.layout.text = name
+            task.width = task.layout.width + 2 * (self.padding_x + self.borderwidth)
+            task.key = key
+            self.stats["layouts"] += 1
+        return task
+
+    def forget(self, window):
+        self.remove_icon_cache(window)
+        self.renamed.pop(window.wid, None)
+        handle = self.deferred.pop(window.wid, None)
+        if handle is not None:
+            handle.cancel()
+        task = self.tasks.pop(window.wid, None)
+        if task is not None:
+            task.layout.finalize()
+
+    def title_changed(self, window):
+        if window.wid in self.deferred:
+            return
+        wait = self.renamed.get(window.wid, 0) + self.title_interval - time.monotonic()
+        if wait > 0:
+            self.stats["deferred"] += 1
+            self.deferred[window.wid] = self.timeout_add(
+                wait, self._retitle, (window,)
+            )
+        else:
+            self._retitle(window)
+
+    def _retitle(self, window):
+        self.deferred.pop(window.wid, None)
+        self.renamed[window.wid] = time.monotonic()
+        self.update(window)
+
+    def content_key(self):
+        icons = self.icon_size != 0
+        return (
+            self.width,
+            self.background,
+            # Colours can be swapped by set_theme
+            self.foreground,
+            self.border,
+            self.unfocused_border,
+            self.urgent_border,
+            tuple(
+                (
+                    w.wid,
+                    w.urgent,
+                    self.task(w).key,
+                    self.get_window_icon(w) if icons else None,
+                )
+                for w in self.windows
+            ),
+        )
+
+    def calc_box_widths(self):
+        windows = self.windows
+        window_count = len(windows)
+        if not window_count:
+            return []
+
+        width_total = self.width - 2 * self.margin_x - (window_count - 1) * self.spacing
+        width_avg = width_total / window_count
+
+        tasks = [self.task(w) for w in windows]
+        if self.icon_size == 0:
+            icons = window_count * [None]
+        else:
+            icons = [self.get_window_icon(w) for w in windows]
+
+        if self.title_width_method == "uniform":
+            width_boxes = window_count * [width_total // window_count]
+        else:
+            width_boxes = [
+                task.width + ((self.icon_size + self.padding_x) if icon else 0)
+                for task, icon in zip(tasks, icons)
+            ]
+
+        if self.max_title_width:
+            width_boxes = [min(w, self.max_title_width) for w in width_boxes]
+
+        width_sum = sum(width_boxes)
+        if width_sum > width_total:
+            # Shrink the boxes wider than the average, like qtile does
+            width_shorter_sum = sum([w for w in width_boxes if w < width_avg])
+            ratio = (width_total - width_shorter_sum) / (width_sum - width_shorter_sum)
+            width_boxes = [(w if w < width_avg else w * ratio) for w in width_boxes]
+
+        return zip(windows, icons, tasks, width_boxes)
+
+    def drawbox(
+        self,
+        offset,
+        task,
+        bordercolor,
+        textcolor,
+        width=None,
+        rounded=False,
+        block=False,
+        icon=None,
+    ):
+        layout = task.layout
+        layout.colour = textcolor
+        if width is not None and layout.width != width:
+            layout.width = width
+
+        icon_padding = (self.icon_size + self.padding_x) if icon else 0
+        padding_x = [self.padding_x + icon_padding, self.padding_x]
+
+        if bordercolor is None:
+            border_width = 0
+            framecolor = self.background or self.bar.background
+        else:
+            border_width = self.borderwidth
+            framecolor = bordercolor
+
+        framed = layout.framed(border_width, framecolor, padding_x, self.padding_y)
+        if block and bordercolor is not None:
+            framed.draw_fill(offset, self.margin_y, rounded)
+        else:
+            framed.draw(offset, self.margin_y, rounded)
+
+        if icon:
+            self.draw_icon(icon, offset)
+
+    def draw(self):
+        self.stats["draws"] += 1
+        images.TaskList.draw(self)
+
+    def finalize(self):
+        for task in self.tasks.values():
+            task.layout.finalize()
+        self.tasks = {}
+        images.TaskList.finalize(self)
@@ -0,0 +1,122 @@
+from libqtile import qtile
+
+import themes
+from utils import expose_command
+
+widget_colours = [
+    "background",
+    "foreground",
+    "foreground_alert",
+    "foreground_urgent",
+    "foreground_low",
+    "graph_color",
+    "fill_color",
+    "border",
+    "border_color",
+    "active",
+    "inactive",
+    "highlight_color",
+    "block_highlight_text_color",
+    "this_current_screen_border",
+    "this_screen_border",
+    "other_current_screen_border",
+    "other_screen_border",
+    "urgent_border",
+    "urgent_text",
+    "colour_have_updates",
+    "colour_no_updates",
+]
+
+layout_colours = [
+    "border_focus",
+    "border_normal",
+    "border_focus_stack",
+    "border_normal_stack",
+]
+
+def _flatten(value):
+    if isinstance(value, dict):
+        return [v for item in value.values() for v in _flatten(item)]
+    if isinstance(value, (list, tuple)):
+        return [v for item in value for v in _flatten(item)]
+    return [value]
+
+def remap(old, changed):
+    pairs = {}
+    for role, value in changed.items():
+        if role not in old:
+            continue
+        for before, after in zip(_flatten(old[role]), _flatten(value)):
+            if isinstance(before, str) and before != after:
+                pairs.setdefault(before.lower(), after)
+    return pairs
+
+def _swap(value, pairs, roles):
+    if isinstance(value, str):
+        role = getattr(value, "role", None)
+        if role is not None:
+            current = themes.lookup(roles, role)
+            if isinstance(current, str):
+                return current
+        colour, dot, alpha = value.partition(".")
+        if colour.lower() in pairs:
+            return pairs[colour.lower()] + dot + alpha
+        return value
+    if isinstance(value, list):
+        return [_swap(v, pairs, roles) for v in value]
+    return value
+
+def repaint(obj, attributes, pairs, roles):
+    touched = False
+    for name in attributes:
+        value = getattr(obj, name, None)
+        if value is None:
+            continue
+        swapped = _swap(value, pairs, roles)
+        if swapped != value:
+            setattr(obj, name, swapped)
+            touched = True
+    return touched
+
+def bars():
+    for screen in qtile.screens:
+        for gap in screen.gaps:
+            if hasattr(gap, "widgets"):
+                yield gap
+
+def apply(changed, old):
+    pairs = remap(old, changed)
+    if not pairs:
+        return
+    roles = themes.current()
+
+    for b in bars():
+        touched = repaint(b, ["background"], pairs, roles)
+        for w in b.widgets:
+            if repaint(w, widget_colours, pairs, roles):
+                touched = True
+            # Text widgets keep their own copy of the text colour
+            layout = getattr(w, "layout", None)
+            if layout is not None and repaint(layout, ["colour"], pairs, roles):
+                touched = True
+        if touched:
+            b.draw()
+
+    for group in qtile.groups:
+        for lay in group.layouts + [group.floating_layout]:
+            repaint(lay, layout_colours, pairs, roles)
+        if group.screen:
+            group.layout_all()
+
+def set_theme(name=None, reload=False):
+    old = themes.current()
+    changed = themes.select(name or themes.palette, reload)
+    apply(changed, old)
+    return sorted(changed)
+
+def reload_theme():
+    return set_theme(reload=True)
+
+def expose():
+    expose_command("set_theme", set_theme)
+    expose_command("reload_theme", reload_theme)
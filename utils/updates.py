@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import re
+import time
+
+from libqtile import bar
+from libqtile.log_utils import logger
+from libqtile.utils import get_cache_dir
+from libqtile.widget import base
+
+class UpdateChecker:
+    def __init__(
+        self,
+        command="checkupdates",
+        update_interval=1800,
+        retry_interval=300,
+        kernel=r"nvidia|linux",
+    ):
+        self.command = command
+        # Cached results younger than this are served without re-running
+        self.update_interval = update_interval
+        self.retry_interval = retry_interval
+        self.kernel = re.compile(kernel)
+        self.packages = None
+        self.stamp = 0
+        self.subscribers = []
+        self.task = None
+
+    @property
+    def cache_file(self):
+        return os.path.join(get_cache_dir(), "updates.json")
+
+    @property
+    def kernel_packages(self):
+        return [p for p in self.packages or [] if self.kernel.search(p[0])]
+
+    @property
+    def expired(self):
+        return time.time() - self.stamp >= self.update_interval
+
+    def load(self):
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cache.get("command") == self.command:
+            self.packages = cache["packages"]
+            self.stamp = cache["stamp"]
+
+    def save(self):
+        cache = {
+            "command": self.command,
+            "packages": self.packages,
+            "stamp": self.stamp,
+        }
+        try:
+            with open(self.cache_file, "w") as f:
+                json.dump(cache, f)
+        except OSError:
+            logger.exception("Unable to write the update cache")
+
+    def subscribe(self, callback):
+        if self.packages is None:
+            self.load()
+        self.subscribers.append(callback)
+        if self.packages is not None:
+            callback(self)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self):
+        for callback in list(self.subscribers):
+            try:
+                callback(self)
+            except Exception:
+                logger.exception("Update subscriber failed")
+
+    async def refresh(self):
+        proc = await asyncio.create_subprocess_shell(
+            self.command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        out, err = await proc.communicate()
+
+        # 2 is checkupdates' exit code when there is nothing to update
+        if proc.returncode not in (0, 2):
+            logger.error(
+                "'%s' failed with exit code %d: %s",
+                self.command,
+                proc.returncode,
+                err.decode().strip(),
+            )
+            return False
+
+        self.packages = []
+        if proc.returncode == 0:
+            for line in out.decode().splitlines():
+                # "name old-version -> new-version"
+                name, _, versions = line.strip().partition(" ")
+                if name:
+                    self.packages.append([name, versions])
+        self.stamp = time.time()
+        self.save()
+        self.publish()
+        return True
+
+    async def _run(self):
+        while self.subscribers:
+            if self.expired and not await self.refresh():
+                delay = self.retry_interval
+            else:
+                delay = self.stamp + self.update_interval - time.time()
+            await asyncio.sleep(max(delay, 1))
+        self.task = None
+
+checker = UpdateChecker()
+
+class Updates(base._TextBox):
+    defaults = [
+        ("checker", None, "UpdateChecker to read from, the shared one if None"),
+        ("subset", "all", "Which packages to count: 'all' or 'kernel'"),
+        ("display_format", "{updates}", "Display format if updates available"),
+        ("no_update_string", "", "String to display if no updates available"),
+        ("colour_have_updates", "ffffff", "Colour when there are updates"),
+        ("colour_no_updates", "ffffff", "Colour when there are no updates"),
+    ]
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "", width=bar.CALCULATED, **config)
+        self.add_defaults(Updates.defaults)
+        self.checker = self.checker or checker
+
+    def timer_setup(self):
+        self.checker.subscribe(self.on_update)
+
+    def finalize(self):
+        self.checker.unsubscribe(self.on_update)
+        base._TextBox.finalize(self)
+
+    def on_update(self, checker):
+        if self.subset == "kernel":
+            packages = checker.kernel_packages
+        else:
+            packages = checker.packages
+
+        if packages:
+            self.layout.colour = self.colour_have_updates
+            self.update(self.display_format.format(updates=len(packages)))
+        else:
+            self.layout.colour = self.colour_no_updates
+            self.update(self.no_update_string)
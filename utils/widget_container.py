@@ -1,104 +1,143 @@
+from functools import lru_cache
+
 from libqtile import widget
 
 import themes
 
 powerline_font = "powerline"
 
-def powerline(
-    widgets=[], colors=themes.power_line_colors, separator_font=powerline_font
-):
-    separator = {
-        "powerline": "",
-        "nerd": "",
-        "unicode": "◀",
-    }
-    separator_size = {
-        "powerline": 23,
-        "nerd": 64,
-        "unicode": 28,
-    }
-    separator_padding = {
-        "powerline": 0,
-        "nerd": -14,
-        "unicode": -4,
-    }
-    w_container = []
-    is_first_color_iteration = True
+separators = {
+    "powerline": {
+        "powerline": ("", 23, 0),
+        "nerd": ("", 64, -14),
+        "unicode": ("◀", 28, -4),
+    },
+    "slanted": {
+        "powerline": ("◢", 28, -4),
+        "nerd": ("", 23, 0),
+        "unicode": ("◢", 28, -4),
+    },
+    "round_left": {
+        "powerline": ("◖", 28, -4),
+        "nerd": ("", 23, 0),
+        "unicode": ("◖", 28, -4),
+    },
+    "round_right": {
+        "powerline": ("◗", 28, -4),
+        "nerd": ("", 23, 0),
+        "unicode": ("◗", 28, -4),
+    },
+}
 
-    for iw in range(len(widgets)):
-        # Generate a looping color index
-        ic = iw
-        while ic >= len(colors):
-            ic = ic - len(colors)
-            is_first_color_iteration = False
+def glyph(shape, options, foreground, background):
+    text, size, padding = separators[shape][options["font"]]
+    return (
+        "TextBox",
+        dict(
+            text=text,
+            foreground=foreground,
+            background=background,
+            fontsize=size,
+            padding=padding,
+        ),
+    )
 
-        # Set the background color for the current segment
-        current_color = colors[ic]
+def spacer(padding, background):
+    return ("Sep", dict(linewidth=0, padding=padding, background=background))
 
-        # Set the background color for the preceding segment
-        if ic != 0:
-            previous_color = colors[ic - 1]
-        else:
-            if is_first_color_iteration:
-                previous_color = themes.background
-            else:
-                previous_color = colors[len(colors) - 1]
-
-        # Create a segment
-        w_container.extend(
-            [
-                widget.TextBox(
-                    text=separator[separator_font],
-                    foreground=current_color,
-                    background=previous_color,
-                    fontsize=separator_size[separator_font],
-                    padding=separator_padding[separator_font],
-                ),
-                *widgets[iw](current_color, themes.fg_dark),
-                widget.Sep(linewidth=0, padding=4, background=current_color),
-            ]
+def _arrow(shape):
+    def segment(current, previous, options):
+        return (
+            [glyph(shape, options, current, previous)],
+            (current, options["fg"]),
+            [spacer(4, current)],
         )
 
-    return w_container
+    return segment
 
-def colorized(widgets=[], colors=themes.power_line_colors, separator_gap=8):
-    w_container = []
-    is_first_color_iteration = True
+def _rounded(current, previous, options):
+    bg = options["bg"]
+    return (
+        [spacer(options["gap"], bg), glyph("round_left", options, current, bg)],
+        (current, options["fg"]),
+        [glyph("round_right", options, current, bg)],
+    )
+
+def _blocks(current, previous, options):
+    return (
+        [spacer(options["gap"], options["bg"])],
+        (current, options["fg"]),
+        [spacer(4, current)],
+    )
 
-    for iw in range(len(widgets)):
-        # Generate a looping color index
-        ic = iw
-        while ic >= len(colors):
-            ic = ic - len(colors)
-            is_first_color_iteration = False
+def _colored_text(current, previous, options):
+    bg = options["bg"]
+    return ([spacer(options["gap"], bg)], (bg, current), [])
 
-        # Set the background color for the current segment
-        current_color = colors[ic]
+styles = {
+    "powerline": (_arrow("powerline"), lambda options: []),
+    "slanted": (_arrow("slanted"), lambda options: []),
+    "rounded": (_rounded, lambda options: []),
+    "gap": (_blocks, lambda options: []),
+    "colorized": (_colored_text, lambda options: [spacer(4, options["bg"])]),
+}
 
-        # Set the background color for the preceding segment
+@lru_cache(maxsize=None)
+def plan(count, colors, style, font, separator_gap, bg, fg):
+    segment, tail = styles[style]
+    options = {"font": font, "gap": separator_gap, "bg": bg, "fg": fg}
+
+    segments = []
+    for iw in range(count):
+        ic = iw % len(colors)
         if ic != 0:
-            previous_color = colors[ic - 1]
+            previous = colors[ic - 1]
+        elif iw == 0:
+            previous = bg
         else:
-            if is_first_color_iteration:
-                previous_color = themes.background
-            else:
-                previous_color = colors[len(colors) - 1]
-
-        # Create a segment
-        w_container.extend(
-            [
-                widget.Sep(
-                    linewidth=0, padding=separator_gap, background=themes.background
-                ),
-                *widgets[iw](themes.background, current_color),
-            ]
-        )
+            previous = colors[-1]
+        segments.append(segment(colors[ic], previous, options))
+    return segments, tail(options)
+
+def build(specs):
+    return [getattr(widget, name)(**args) for name, args in specs]
 
-    # Create an extra gap after the widget
-    w_container.extend(
-        [
-            widget.Sep(linewidth=0, padding=4, background=themes.background),
-        ]
+def container(
+    widgets=[],
+    colors=None,
+    style="powerline",
+    separator_font=powerline_font,
+    separator_gap=8,
+):
+    segments, tail = plan(
+        len(widgets),
+        tuple(colors or themes.power_line_colors),
+        style,
+        separator_font,
+        separator_gap,
+        themes.background,
+        themes.fg_dark,
     )
 
+    w_container = []
+    for make_widgets, (before, (bg, fg), after) in zip(widgets, segments):
+        w_container.extend([*build(before), *make_widgets(bg, fg), *build(after)])
+    w_container.extend(build(tail))
     return w_container
+
+def powerline(widgets=[], colors=None, separator_font=powerline_font):
+    return container(widgets, colors, "powerline", separator_font=separator_font)
+
+def slanted(widgets=[], colors=None, separator_font=powerline_font):
+    return container(widgets, colors, "slanted", separator_font=separator_font)
+
+def rounded(
+    widgets=[], colors=None, separator_font=powerline_font, separator_gap=8
+):
+    return container(widgets, colors, "rounded", separator_font, separator_gap)
+
+def gap(widgets=[], colors=None, separator_gap=8):
+    return container(widgets, colors, "gap", separator_gap=separator_gap)
+
+def colorized(widgets=[], colors=None, separator_gap=8):
+    return container(widgets, colors, "colorized", separator_gap=separator_gap)